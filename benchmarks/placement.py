@@ -0,0 +1,175 @@
+# Placement latency and scaling benchmark, run from the repository root:
+#   python -m benchmarks.placement --activations 10 100 1000 --nodes 1 100 1000
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from statistics import median
+
+import numpy as np
+
+from online_bin_packing.classes import all_action_class
+from online_bin_packing.cluster import Cluster
+from online_bin_packing.models import Action, Node
+from online_bin_packing.simulation import Simulation
+from online_bin_packing.solver.bin_packing import BinPackingType, bin_packing, sharded_bin_packing
+from online_bin_packing.solver.sequential import sequential, shuffle_sequential
+from online_bin_packing.solver.vector_packing import (
+    best_fit, completion_time_fit, dot_product, first_fit_decreasing, l2_norm
+)
+from online_bin_packing.utils import call_solver
+from online_bin_packing.workload import ActivationBatch
+
+ACTIVATIONS = (10, 100, 1000, 10_000, 100_000)
+NODES = (1, 10, 100, 1000, 10_000)
+
+# name: (solver, kwargs, runs on a Cluster)
+ENGINES = {
+    'sequential': (sequential, {}, False),
+    'shuffle_sequential': (shuffle_sequential, {}, False),
+    'memory bin packing': (bin_packing, {'bin_type': BinPackingType.MEMORY}, False),
+    'cpu bin packing': (bin_packing, {'bin_type': BinPackingType.CPU}, False),
+    'both bin packing': (bin_packing, {'bin_type': BinPackingType.BOTH}, False),
+    'sharded bin packing': (sharded_bin_packing, {'bin_type': BinPackingType.BOTH}, False),
+    'first fit decreasing': (first_fit_decreasing, {}, False),
+    'best fit': (best_fit, {}, False),
+    'dot product': (dot_product, {}, False),
+    'l2 norm': (l2_norm, {}, False),
+    'completion time': (completion_time_fit, {}, False),
+    'cluster sequential': (sequential, {}, True),
+    'cluster both bin packing': (bin_packing, {'bin_type': BinPackingType.BOTH}, True),
+    'cluster first fit decreasing': (first_fit_decreasing, {}, True),
+    'cluster completion time': (completion_time_fit, {}, True),
+}
+
+
+def synthetic_activations(action_classes: list['ActionClass'], count: int, seed: int) -> list[Action]:
+    rng = np.random.default_rng(seed)
+    class_id = rng.integers(len(action_classes), size=count)
+    cpu = np.array([c.best_cpu for c in action_classes], dtype=float)[class_id]
+    memory = np.array([c.best_memory for c in action_classes], dtype=float)[class_id]
+    duration = np.array([c.duration_of_best_config for c in action_classes], dtype=float)[class_id]
+    zeros = np.zeros(count, dtype=np.int64)
+    return ActivationBatch(action_classes, zeros, class_id, cpu, memory, duration, zeros * 0.0).to_actions()
+
+
+def synthetic_nodes(
+        action_classes: list['ActionClass'],
+        count: int,
+        seed: int,
+        simulation: Simulation,
+        cluster: bool
+) -> list[Node] | Cluster:
+    # every existing node is filled to a random fraction of its capacity by already running actions
+    rng = np.random.default_rng(seed + 1)
+    nodes = [simulation.new_node() for _ in range(count)]
+    for node, fill in zip(nodes, rng.uniform(0, 0.8, size=count)):
+        while True:
+            action = action_classes[rng.integers(len(action_classes))].generate_activation()
+            if not node.can_run_action(action) or node.memory - node.free_memory + action.memory > fill * node.memory:
+                break
+            action.add_to_node(node)
+    if not cluster:
+        return nodes
+    state = Cluster(simulation=simulation)
+    for node in nodes:
+        j = state.add_node(node.memory, node.cpu)
+        if node.actions:
+            state.place(state.add_activations(node.actions), j)
+    return state
+
+
+def nodes_used(nodes: list[Node] | Cluster) -> int:
+    if isinstance(nodes, Cluster):
+        return len(nodes.active_nodes)
+    return sum(1 for n in nodes if n.actions)
+
+
+def run_case(
+        action_classes: list['ActionClass'],
+        engine: str,
+        activations: int,
+        nodes: int,
+        repeats: int,
+        seed: int
+) -> dict:
+    solver, kwargs, cluster = ENGINES[engine]
+    result = {'engine': engine, 'activations': activations, 'nodes': nodes}
+    latencies = []
+    # the last run is traced for peak memory only, tracing slows the solver down too much to time it
+    for repeat in range(repeats + 1):
+        simulation = Simulation(seed=seed + repeat)
+        state = synthetic_nodes(action_classes, nodes, seed, simulation, cluster)
+        before = state.node_count if cluster else len(state)
+        batch = synthetic_activations(action_classes, activations, seed)
+        if repeat == repeats:
+            tracemalloc.start()
+        start = time.perf_counter()
+        state, solve_info = call_solver(solver, activations=batch, nodes=state, simulation=simulation, **kwargs)
+        latencies.append(time.perf_counter() - start)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    latencies = latencies[:-1]
+    result.update({
+        'latency': median(latencies),
+        'latency_min': min(latencies),
+        'latency_max': max(latencies),
+        'peak_memory': peak_memory,
+        'nodes_used': nodes_used(state),
+        'new_nodes': (state.node_count if cluster else len(state)) - before,
+        'solve_status': solve_info.status,
+        'solves': solve_info.solves,
+    })
+    return result
+
+
+def metadata(args: argparse.Namespace) -> dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': int(time.time()),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'repeats': args.repeats,
+        'seed': args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure per-slot placement latency, peak memory and nodes used.')
+    parser.add_argument('--activations', type=int, nargs='+', default=ACTIVATIONS)
+    parser.add_argument('--nodes', type=int, nargs='+', default=NODES)
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=f'benchmarks/results/placement-{int(time.time())}.json')
+    args = parser.parse_args()
+
+    results = []
+    for activations in args.activations:
+        for nodes in args.nodes:
+            for engine in args.engines:
+                result = run_case(all_action_class, engine, activations, nodes, args.repeats, args.seed)
+                results.append(result)
+                print(json.dumps(result))
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'meta': metadata(args), 'results': results}, f, indent=2)
+    print(f'written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
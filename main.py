@@ -1,12 +1,22 @@
-# Example usage
+# Example usage, `python main.py --resume ../result/<run>` continues an interrupted run from its checkpoints
+# and `python main.py --check` runs every algorithm over the first slots on a Cluster, as a quick smoke test
+
+import argparse
+import os
+
+import numpy as np
 
 from online_bin_packing import system
 from online_bin_packing.classes import all_action_class
-from online_bin_packing.models import Action, Node, Report
+from online_bin_packing.compare import Algorithm, compare
+from online_bin_packing.metrics import MetricsSink
+from online_bin_packing.models import Action, Node
+from online_bin_packing.simulation import Simulation
 from online_bin_packing.solver.bin_packing import bin_packing, BinPackingType
 from online_bin_packing.solver.sequential import sequential, shuffle_sequential
-from online_bin_packing.system import TIME_SLOT
-from online_bin_packing.utils import run_solver
+from online_bin_packing.solver.vector_packing import first_fit_decreasing
+from online_bin_packing.trace import record
+from online_bin_packing.workload import WorkloadGenerator
 
 
 def print_nodes(algorithm: str, nodes: list[Node]):
@@ -25,74 +35,64 @@ def print_nodes(algorithm: str, nodes: list[Node]):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--resume', metavar='RESULT_DIR', help='result directory of the run to continue')
+    parser.add_argument(
+        '--check', action='store_true',
+        help='replay the first slots with every algorithm on a Cluster of arrays and stop'
+    )
+    args = parser.parse_args()
+
+    if system.PLOT:
+        for action_class in all_action_class:
+            action_class.plot()
 
+    simulation = Simulation(seed=0, result_dir=args.resume or system.result_dir)
     actions: dict[int:Action] = {}
-    activations = []
+    slots = int(60 * 2 / simulation.time_slot)
 
-    for action_class in all_action_class:
-        activations += [action_class.generate_activation() for _ in range(100)]
+    # the first slot starts with 100 activations of every class, later slots follow the arrival model
+    generator = WorkloadGenerator(all_action_class, seed=simulation.seed, time_slot=simulation.time_slot)
+    counts = generator.arrival_counts(slots)
+    counts[0] = 100
+    workload = generator.from_counts(counts)
+    if not os.path.exists(f'{simulation.result_dir}/workload.trace'):
+        record(f'{simulation.result_dir}/workload.trace', workload, simulation.time_slot)
 
     # activations += [actions[5]] * 50
     # activations += [actions[2]] * 50
 
-    memory_bin_packing_nodes: list[Node] = []
-    memory_bin_packing_reports: list[Report] = []
-
-    cpu_bin_packing_nodes: list[Node] = []
-    cpu_bin_packing_reports: list[Report] = []
-
-    both_bin_packing_nodes: list[Node] = []
-    both_bin_packing_reports: list[Report] = []
-
-    sequential_nodes: list[Node] = []
-    sequential_reports: list[Report] = []
-
-    shuffle_sequential_nodes: list[Node] = []
-    shuffle_sequential_reports: list[Report] = []
-
-    for _ in range(int(60 * 2 / TIME_SLOT)):
-        memory_bin_packing_nodes = run_solver(
-            algorithm_name='memory bin packing',
-            solver=bin_packing,
-            nodes=memory_bin_packing_nodes,
-            activations=activations,
-            reports=memory_bin_packing_reports,
-            active_nodes=[],
-            bin_type=BinPackingType.MEMORY
-        )
-        cpu_bin_packing_nodes = run_solver(
-            algorithm_name='cpu bin packing',
-            solver=bin_packing,
-            nodes=cpu_bin_packing_nodes,
-            activations=activations,
-            reports=cpu_bin_packing_reports,
-            active_nodes=[],
-            bin_type=BinPackingType.CPU
-        )
-        both_bin_packing_nodes = run_solver(
-            algorithm_name='both bin packing',
-            solver=bin_packing,
-            nodes=both_bin_packing_nodes,
-            activations=activations,
-            reports=both_bin_packing_reports,
-            active_nodes=[],
-            bin_type=BinPackingType.BOTH
-        )
-        sequential_nodes = run_solver(
-            algorithm_name='sequential',
-            solver=sequential,
-            nodes=sequential_nodes,
-            activations=activations,
-            reports=sequential_reports
+    sink = MetricsSink(f'{simulation.result_dir}/solver')
+
+    algorithms = [
+        Algorithm('memory bin packing', bin_packing, bin_type=BinPackingType.MEMORY),
+        Algorithm('cpu bin packing', bin_packing, bin_type=BinPackingType.CPU),
+        Algorithm('both bin packing', bin_packing, bin_type=BinPackingType.BOTH),
+        Algorithm('sequential', sequential),
+        Algorithm('shuffle', shuffle_sequential),
+        Algorithm('first fit decreasing', first_fit_decreasing),
+    ]
+    if args.check:
+        # every solver gets the trace's activation batches on the array backed Cluster
+        reports = compare(
+            algorithms=[Algorithm(a.name, a.solver, cluster=True, **a.kwargs) for a in algorithms],
+            workload=workload[:int(np.searchsorted(workload.slot, 10))],
+            action_classes=all_action_class,
+            simulation=simulation
         )
-        shuffle_sequential_nodes = run_solver(
-            algorithm_name='shuffle',
-            solver=shuffle_sequential,
-            nodes=shuffle_sequential_nodes, activations=activations,
-            reports=shuffle_sequential_reports
-        )
-
-        system.SYSTEM_TIME += TIME_SLOT
-        activations = []
-        for action_class in all_action_class:
-            activations += [action_class.generate_activation() for _ in range(action_class.get_inter_arrival())]
+        for name, algorithm_reports in reports.items():
+            print(name, algorithm_reports[-1].node_count)
+        raise SystemExit
+
+    # each algorithm replays the recorded workload in its own process, reports are merged into the sink
+    compare(
+        algorithms=algorithms,
+        workload=f'{simulation.result_dir}/workload.trace',
+        action_classes=all_action_class,
+        sink=sink,
+        simulation=simulation,
+        checkpoint_dir=f'{simulation.result_dir}/checkpoints'
+    )
+
+    sink.close()
+    sink.render()
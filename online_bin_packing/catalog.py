@@ -0,0 +1,65 @@
+import numpy as np
+
+from online_bin_packing.system import NODE_CATALOG
+
+
+class NodeShape:
+    def __init__(self, name: str, memory: float, cpu: float, price_hour: float):
+        self.name = name
+        self.memory = memory
+        self.cpu = cpu
+        self.price_hour = price_hour
+
+    def price_time_slot(self, time_slot: float) -> float:
+        return self.price_hour / (60 * 60 / time_slot)
+
+    def __repr__(self):
+        return f'NodeShape({self.name!r}, {self.memory}, {self.cpu}, {self.price_hour})'
+
+
+# the general purpose shape of a single shape simulation next to a cpu heavy and a memory heavy one
+HETEROGENEOUS_CATALOG = [NodeShape(*shape) for shape in NODE_CATALOG]
+
+
+def mix_price(catalog: list[NodeShape], memory: float, cpu: float) -> list[float]:
+    # price of serving the demand with each shape alone, by the fraction of a node it fills in its tighter dimension
+    return [shape.price_hour * max(memory / shape.memory, cpu / shape.cpu, 1e-12) for shape in catalog]
+
+
+def shape_weights(catalog: list[NodeShape], memory: float, cpu: float) -> list[float]:
+    """How much more than the cheapest shape each shape costs for demand in this memory/cpu mix, at least 1."""
+    prices = mix_price(catalog, memory, cpu)
+    return [price / min(prices) for price in prices]
+
+
+def pending_demand(
+        catalog: list[NodeShape], memory, cpu, used_memory: float = 0, used_cpu: float = 0
+) -> tuple[np.ndarray, np.ndarray]:
+    # running demand plus each item and the ones after it, what a node opened for the item is shaped for
+    if len(catalog) == 1:
+        return np.zeros(len(memory)), np.zeros(len(cpu))
+    return (
+        used_memory + np.cumsum(np.asarray(memory, dtype=float)[::-1])[::-1],
+        used_cpu + np.cumsum(np.asarray(cpu, dtype=float)[::-1])[::-1]
+    )
+
+
+def choose_shape(
+        catalog: list[NodeShape],
+        memory: float,
+        cpu: float,
+        item_memory: float = 0,
+        item_cpu: float = 0
+) -> int:
+    """Index of the shape that serves the memory and cpu demand at the lowest price.
+
+    The demand is what runs on the nodes plus what is still to be placed, so a
+    node is shaped for the mix it will keep serving rather than for the last few
+    activations of a slot. Only shapes that fit the item about to be placed are
+    considered.
+    """
+    if len(catalog) == 1:
+        return 0
+    prices = mix_price(catalog, memory, cpu)
+    fits = [k for k, shape in enumerate(catalog) if item_memory <= shape.memory and item_cpu <= shape.cpu]
+    return min(fits or range(len(catalog)), key=prices.__getitem__)
@@ -0,0 +1,138 @@
+import io
+import os
+import pickle
+
+from online_bin_packing.cluster import Cluster
+from online_bin_packing.models import Node, Report
+from online_bin_packing.simulation import Simulation
+
+# run_solver arguments that carry state from one slot to the next
+STATEFUL = ('provisioner', 'consolidator')
+
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file, references: dict[int, tuple]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.references = references
+
+    def persistent_id(self, obj):
+        return self.references.get(id(obj))
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, objects: dict[tuple, object]):
+        super().__init__(file)
+        self.objects = objects
+
+    def persistent_load(self, pid):
+        if pid not in self.objects:
+            raise pickle.UnpicklingError(f'checkpoint refers to {pid}, which this run does not have')
+        return self.objects[pid]
+
+
+def _shared(simulation: Simulation, action_classes: list['ActionClass'] | None) -> dict[tuple, object]:
+    # objects every node and action points to, stored by name and restored as the ones of the resuming run
+    objects = {('simulation',): simulation}
+    objects.update({('shape', k): shape for k, shape in enumerate(simulation.catalog)})
+    objects.update({('class', c.name): c for c in action_classes or []})
+    return objects
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    # a reader sees either the previous file or the complete new one, never a partial write
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Checkpointer:
+    """Periodic checkpoints of one replay, in `directory`.
+
+    Every `every` slots the nodes with their running actions, the clock, both RNG
+    states and the state of the provisioner and consolidator are written to
+    `checkpoint.pkl` at once. Action classes, node shapes and the simulation are
+    stored by name, so a checkpoint stays small and is restored onto the objects
+    of the resuming run. Reports are appended to `reports.pkl` and the checkpoint
+    keeps how much of it was written, anything after that is dropped on resume.
+    """
+
+    def __init__(self, directory: str, every: int = 100):
+        self.directory = directory
+        self.every = every
+        # reports and bytes of the report log the last checkpoint covers
+        self._written = 0
+        self._offset = 0
+
+    @property
+    def path(self) -> str:
+        return f'{self.directory}/checkpoint.pkl'
+
+    @property
+    def reports_path(self) -> str:
+        return f'{self.directory}/reports.pkl'
+
+    def due(self, slot: int) -> bool:
+        return (slot + 1) % self.every == 0
+
+    def save(
+            self,
+            slot: int,
+            nodes: list[Node] | Cluster,
+            reports: list[Report],
+            simulation: Simulation,
+            action_classes: list['ActionClass'] | None = None,
+            state: dict | None = None
+    ) -> None:
+        """Checkpoints the run after `slot`, so a resume starts at the slot after it."""
+        os.makedirs(self.directory, exist_ok=True)
+        references = {id(obj): pid for pid, obj in _shared(simulation, action_classes).items()}
+        with open(self.reports_path, 'ab') as f:
+            f.truncate(self._offset)
+            for report in reports[self._written:]:
+                _Pickler(f, references).dump(report)
+            f.flush()
+            os.fsync(f.fileno())
+            self._offset = f.tell()
+        self._written = len(reports)
+
+        buffer = io.BytesIO()
+        _Pickler(buffer, references).dump({
+            'slot': slot + 1,
+            'time': simulation.time,
+            'random': simulation.random.getstate(),
+            'rng': simulation.rng.bit_generator.state,
+            'nodes': nodes,
+            'state': state or {},
+            'reports': len(reports),
+            'reports_offset': self._offset,
+        })
+        atomic_write(self.path, buffer.getvalue())
+
+    def load(self, simulation: Simulation, action_classes: list['ActionClass'] | None = None) -> dict | None:
+        """Restores the clock and RNG states into `simulation` and returns the checkpoint, None without one.
+
+        The returned dict has the next `slot` to run, the `nodes`, the `reports`
+        written so far and the saved `state` of the stateful solver arguments.
+        """
+        if not os.path.exists(self.path):
+            return None
+        objects = _shared(simulation, action_classes)
+        with open(self.path, 'rb') as f:
+            checkpoint = _Unpickler(f, objects).load()
+
+        reports = []
+        with open(self.reports_path, 'r+b') as f:
+            # reports appended after the checkpoint are computed again
+            f.truncate(checkpoint['reports_offset'])
+            while f.tell() < checkpoint['reports_offset']:
+                reports.append(_Unpickler(f, objects).load())
+        checkpoint['reports'] = reports
+        self._written, self._offset = len(reports), checkpoint['reports_offset']
+
+        simulation.time = checkpoint['time']
+        simulation.random.setstate(checkpoint['random'])
+        simulation.rng.bit_generator.state = checkpoint['rng']
+        return checkpoint
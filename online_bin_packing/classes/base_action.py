@@ -1,12 +1,13 @@
+import hashlib
+import json
 import os
 
 import numpy as np
-from matplotlib import pyplot as plt
-from scipy.optimize import differential_evolution
 
+from online_bin_packing.checkpoint import atomic_write
 from online_bin_packing.models import Action
 from online_bin_packing.system import MIN_MEMORY_ACTION, MIN_CPU_ACTION, MAX_CPU_ACTION, \
-    MAX_MEMORY_ACTION, PLOT, result_dir
+    MAX_MEMORY_ACTION, cache_dir, result_dir
 
 
 class ActionClass:
@@ -22,16 +23,22 @@ class ActionClass:
         self.cpu_pars: list[float] = cpu_pars
         self.result_dir = f'{result_dir}/action class/{self.name}'
         self.inter_arrival_mean: int = inter_arrival_mean
-        if PLOT and not os.path.exists(self.result_dir):
-            os.makedirs(self.result_dir)
-        self.__set_best_config()
-        self._plot()
+        self._best_config: tuple[float, int] | None = None
+        self._duration_of_best_config: float | None = None
+        self._exec_time_memory_max: float = self.exec_time_memory(MAX_MEMORY_ACTION)
+
+    def __copy__(self) -> 'ActionClass':
+        return self
+
+    def __deepcopy__(self, memo: dict) -> 'ActionClass':
+        # action classes are immutable and shared by every action of the class
+        return self
 
     def get_inter_arrival(self) -> int:
         return round(np.random.gamma(shape=self.inter_arrival_mean ** 2, scale=1 / self.inter_arrival_mean))
 
-    def generate_activation(self) -> Action:
-        return Action(self)
+    def generate_activation(self, cpu: float | None = None, memory: int | None = None) -> Action:
+        return Action(self, cpu=cpu, memory=memory)
 
     def get_lambda_cost_memory(self, memory: int, exec_time: float | None = None):
         exec_time = exec_time if exec_time is not None else self.exec_time(MAX_CPU_ACTION, memory)
@@ -41,15 +48,12 @@ class ActionClass:
         exec_time = exec_time if exec_time is not None else self.exec_time(cpu, MAX_MEMORY_ACTION)
         return 0.0000002 + (cpu / 6.0) * exec_time * 0.0867
 
-    def exec_time(self, cpu: float, memory: int):
-        return self.exec_time_cpu(cpu) * (
-                self.exec_time_memory(memory) / self.exec_time_memory(MAX_MEMORY_ACTION)
-        )
+    def exec_time(self, cpu: float | np.ndarray, memory: int | np.ndarray):
+        # works element-wise on arrays, so a batch of actions is one call
+        return self.exec_time_cpu(cpu) * (self.exec_time_memory(memory) / self._exec_time_memory_max)
 
-    def cost(self, cpu: float, memory: int):
-        exec_time = self.exec_time_cpu(cpu) * (
-                self.exec_time_memory(memory) / self.exec_time_memory(MAX_MEMORY_ACTION)
-        )
+    def cost(self, cpu: float | np.ndarray, memory: int | np.ndarray):
+        exec_time = self.exec_time(cpu, memory)
         return self.get_lambda_cost_cpu(cpu, exec_time) + self.get_lambda_cost_memory(memory, exec_time)
 
     def exec_time_memory(self, memory: int):
@@ -60,7 +64,55 @@ class ActionClass:
         pars: list[float] = self.cpu_pars
         return pars[0] + pars[1] * (1 - pars[2]) ** (cpu - MIN_CPU_ACTION)
 
-    def __set_best_config(self):
+    def rescale_terms(
+            self, resource: str, cpu: np.ndarray, memory: np.ndarray
+    ) -> tuple[float, float, np.ndarray]:
+        # exec_time as scale * rate ** (x - offset) plus a constant in one resource, the other one held fixed
+        if resource == 'cpu':
+            pars, offset = self.cpu_pars, MIN_CPU_ACTION
+            weight = self.exec_time_memory(memory) / self._exec_time_memory_max
+        else:
+            pars, offset = self.memory_pars, MIN_MEMORY_ACTION
+            weight = self.exec_time_cpu(cpu) / self._exec_time_memory_max
+        return offset, 1 - pars[2], weight * pars[1]
+
+    @property
+    def config_key(self) -> str:
+        key = json.dumps({
+            'cpu_pars': list(self.cpu_pars),
+            'memory_pars': list(self.memory_pars),
+            'bounds': [MIN_CPU_ACTION, MAX_CPU_ACTION, MIN_MEMORY_ACTION, MAX_MEMORY_ACTION],
+        })
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @property
+    def best_cpu(self) -> float:
+        return self.best_config[0]
+
+    @property
+    def best_memory(self) -> int:
+        return self.best_config[1]
+
+    @property
+    def best_config(self) -> tuple[float, int]:
+        # searched once per parameter set and kept on disk, so later runs only read a small json file
+        if self._best_config is None:
+            path = f'{cache_dir}/action_class/{self.config_key}.json'
+            if os.path.exists(path):
+                with open(path) as f:
+                    cached = json.load(f)
+                self._best_config = (cached['best_cpu'], cached['best_memory'])
+            else:
+                self._best_config = self.__search_best_config()
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                atomic_write(path, json.dumps({
+                    'best_cpu': self._best_config[0], 'best_memory': self._best_config[1]
+                }).encode())
+        return self._best_config
+
+    def __search_best_config(self) -> tuple[float, int]:
+        from scipy.optimize import differential_evolution
+
         def objective_function(variables):
             cpu, memory = variables
             return self.get_lambda_cost_cpu(cpu) + self.get_lambda_cost_memory(memory)
@@ -73,18 +125,17 @@ class ActionClass:
         # Extract the optimal solution
         optimal_solution = problem.x
 
-        self.best_memory = int(optimal_solution[1])
-        self.best_cpu = round(optimal_solution[0], 2)
+        return round(float(optimal_solution[0]), 2), int(optimal_solution[1])
 
     @property
     def duration_of_best_config(self) -> float:
-        return self.exec_time(self.best_cpu, self.best_memory)
-
-    def _plot(self):
-        if PLOT:
-            self.plot()
+        if self._duration_of_best_config is None:
+            self._duration_of_best_config = float(self.exec_time(self.best_cpu, self.best_memory))
+        return self._duration_of_best_config
 
     def plot(self):
+        if not os.path.exists(self.result_dir):
+            os.makedirs(self.result_dir)
         self._plot_cost_cpu()
         self._plot_exec_time_cpu()
         self._plot_cost_memory()
@@ -100,6 +151,8 @@ class ActionClass:
             f.write(f"inter_arrival_mean: {self.inter_arrival_mean}\n")
 
     def _plot_exec_time_cpu(self):
+        from matplotlib import pyplot as plt
+
         cpu_y = self.exec_time_cpu(self.cpu_x)
         plt.plot(self.cpu_x, cpu_y)
         plt.title(f'class {self.name}')
@@ -109,6 +162,8 @@ class ActionClass:
         plt.close()
 
     def _plot_exec_time_memory(self):
+        from matplotlib import pyplot as plt
+
         memory_y = self.exec_time_memory(self.memory_x)
         plt.plot(self.memory_x, memory_y)
         plt.title(f'class {self.name}')
@@ -118,6 +173,8 @@ class ActionClass:
         plt.close()
 
     def _plot_cost_cpu(self):
+        from matplotlib import pyplot as plt
+
         cpu_y = self.get_lambda_cost_cpu(self.cpu_x)
         plt.plot(self.cpu_x, cpu_y)
         plt.title(f'class {self.name}')
@@ -127,6 +184,8 @@ class ActionClass:
         plt.close()
 
     def _plot_cost_memory(self):
+        from matplotlib import pyplot as plt
+
         memory_y = self.get_lambda_cost_memory(self.memory_x)
         plt.plot(self.memory_x, memory_y)
         plt.title(f'class {self.name}')
@@ -136,6 +195,8 @@ class ActionClass:
         plt.close()
 
     def _plot_cost(self):
+        from matplotlib import pyplot as plt
+
         X, Y = np.meshgrid(self.cpu_x, self.memory_x)
 
         # Create the figure and the 3D plot
@@ -155,6 +216,8 @@ class ActionClass:
         plt.close()
 
     def _plot_exec_time(self):
+        from matplotlib import pyplot as plt
+
         X, Y = np.meshgrid(self.cpu_x, self.memory_x)
 
         # Create the figure and the 3D plot
@@ -0,0 +1,287 @@
+import numpy as np
+
+from online_bin_packing.rescaling import rescale_resources
+from online_bin_packing.simulation import Simulation, default_simulation
+from online_bin_packing.workload import ActivationBatch
+
+
+class Cluster:
+    """Struct-of-arrays view of a set of nodes and the actions running on them.
+
+    Node capacity/usage and action cpu/memory/start/duration/node are kept in
+    NumPy arrays, so placement, stop and utilization queries are vectorized
+    instead of re-summing a Python list of `Action` objects per node.
+    """
+
+    def __init__(self, capacity: int = 64, simulation: Simulation | None = None):
+        self.simulation: Simulation = default_simulation if simulation is None else simulation
+        self.node_count = 0
+        self.node_memory = np.zeros(capacity)
+        self.node_cpu = np.zeros(capacity)
+        self.usage_memory = np.zeros(capacity)
+        self.usage_cpu = np.zeros(capacity)
+        self.node_actions = np.zeros(capacity, dtype=np.int64)
+        # index of each node's shape in the simulation's catalog
+        self.node_shape = np.zeros(capacity, dtype=np.int64)
+        # latest end time of the actions on each node, -inf while idle, kept up to date by every change
+        self.node_end = np.full(capacity, -np.inf)
+
+        self.action_count = 0
+        self.action_memory = np.zeros(capacity)
+        self.action_cpu = np.zeros(capacity)
+        self.action_start = np.zeros(capacity)
+        self.action_duration = np.zeros(capacity)
+        self.action_node = np.full(capacity, -1, dtype=np.int64)
+        self.action_class = np.zeros(capacity, dtype=np.int64)
+
+        self.action_classes: list['ActionClass'] = []
+        self._class_ids: dict[int, int] = {}
+
+    def __getstate__(self) -> dict:
+        # object ids mean nothing in another process, the map is rebuilt from action_classes on load
+        state = self.__dict__.copy()
+        del state['_class_ids']
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._class_ids = {id(c): k for k, c in enumerate(self.action_classes)}
+
+    @staticmethod
+    def _grow(array: np.ndarray, size: int, fill=0) -> np.ndarray:
+        if size <= len(array):
+            return array
+        grown = np.full(max(size, 2 * len(array)), fill, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    # nodes
+
+    def add_nodes(
+            self, count: int = 1, memory: float | None = None, cpu: float | None = None, shape: int = 0
+    ) -> np.ndarray:
+        memory = self.simulation.catalog[shape].memory if memory is None else memory
+        cpu = self.simulation.catalog[shape].cpu if cpu is None else cpu
+        start, end = self.node_count, self.node_count + count
+        self.node_memory = self._grow(self.node_memory, end)
+        self.node_cpu = self._grow(self.node_cpu, end)
+        self.usage_memory = self._grow(self.usage_memory, end)
+        self.usage_cpu = self._grow(self.usage_cpu, end)
+        self.node_actions = self._grow(self.node_actions, end)
+        self.node_shape = self._grow(self.node_shape, end)
+        self.node_shape[start:end] = shape
+        self.node_end = self._grow(self.node_end, end, fill=-np.inf)
+        self.node_end[start:end] = -np.inf
+        self.node_memory[start:end] = memory
+        self.node_cpu[start:end] = cpu
+        self.node_count = end
+        return np.arange(start, end)
+
+    def add_node(self, memory: float | None = None, cpu: float | None = None, shape: int = 0) -> int:
+        return int(self.add_nodes(1, memory, cpu, shape)[0])
+
+    def release(self, nodes: np.ndarray | int):
+        # drops idle nodes, the nodes after them move down and their actions follow
+        nodes = np.atleast_1d(nodes)
+        nodes = nodes[self.node_actions[nodes] == 0]
+        if not len(nodes):
+            return
+        keep = np.ones(self.node_count, dtype=bool)
+        keep[nodes] = False
+        count = int(keep.sum())
+        for name in ('node_memory', 'node_cpu', 'usage_memory', 'usage_cpu', 'node_actions', 'node_shape'):
+            array = getattr(self, name)
+            array[:count] = array[:self.node_count][keep]
+            array[count:self.node_count] = 0
+        self.node_end[:count] = self.node_end[:self.node_count][keep]
+        self.node_end[count:self.node_count] = -np.inf
+        renumber = np.cumsum(keep) - 1
+        running = self.running_actions
+        self.action_node[running] = renumber[self.action_node[running]]
+        self.node_count = count
+
+    @property
+    def free_memory(self) -> np.ndarray:
+        return self.node_memory[:self.node_count] - self.usage_memory[:self.node_count]
+
+    @property
+    def free_cpu(self) -> np.ndarray:
+        return self.node_cpu[:self.node_count] - self.usage_cpu[:self.node_count]
+
+    def can_run(self, cpu: float, memory: float) -> np.ndarray:
+        return (self.free_cpu >= cpu) & (self.free_memory >= memory)
+
+    def cpu_utilization(self) -> np.ndarray:
+        return np.round(self.usage_cpu[:self.node_count] / self.node_cpu[:self.node_count], 2)
+
+    def memory_utilization(self) -> np.ndarray:
+        return np.round(self.usage_memory[:self.node_count] / self.node_memory[:self.node_count], 2)
+
+    @property
+    def active_nodes(self) -> np.ndarray:
+        return np.flatnonzero(self.node_actions[:self.node_count])
+
+    def time_to_end(self) -> np.ndarray:
+        return self.node_end[:self.node_count] - self.simulation.time
+
+    def _refresh_end(self, nodes: np.ndarray):
+        # recomputed only for nodes that lost actions or whose durations changed
+        nodes = np.unique(nodes)
+        if not len(nodes):
+            return
+        running = self.running_actions
+        selected = running[np.isin(self.action_node[running], nodes)]
+        self.node_end[nodes] = -np.inf
+        np.maximum.at(
+            self.node_end, self.action_node[selected], self.action_start[selected] + self.action_duration[selected]
+        )
+
+    # actions
+
+    def _class_id(self, action_class: 'ActionClass') -> int:
+        key = id(action_class)
+        if key not in self._class_ids:
+            self._class_ids[key] = len(self.action_classes)
+            self.action_classes.append(action_class)
+        return self._class_ids[key]
+
+    def add_actions(
+            self, cpu: np.ndarray, memory: np.ndarray, duration: np.ndarray, class_id: np.ndarray | int = 0
+    ) -> np.ndarray:
+        start, end = self.action_count, self.action_count + len(cpu)
+        self.action_memory = self._grow(self.action_memory, end)
+        self.action_cpu = self._grow(self.action_cpu, end)
+        self.action_start = self._grow(self.action_start, end)
+        self.action_duration = self._grow(self.action_duration, end)
+        self.action_node = self._grow(self.action_node, end, fill=-1)
+        self.action_class = self._grow(self.action_class, end)
+        self.action_memory[start:end] = memory
+        self.action_cpu[start:end] = cpu
+        self.action_duration[start:end] = duration
+        self.action_class[start:end] = class_id
+        self.action_node[start:end] = -1
+        self.action_count = end
+        return np.arange(start, end)
+
+    def add_activations(self, activations: list['Action'] | ActivationBatch) -> np.ndarray:
+        if isinstance(activations, ActivationBatch):
+            class_ids = np.array([self._class_id(c) for c in activations.action_classes], dtype=np.int64)
+            return self.add_actions(
+                cpu=activations.cpu,
+                memory=activations.memory,
+                duration=activations.duration,
+                class_id=class_ids[activations.class_id] if len(class_ids) else activations.class_id,
+            )
+        return self.add_actions(
+            cpu=np.array([a.cpu for a in activations], dtype=float),
+            memory=np.array([a.memory for a in activations], dtype=float),
+            duration=np.array([a.duration for a in activations], dtype=float),
+            class_id=np.array([self._class_id(a.action_class) for a in activations], dtype=np.int64),
+        )
+
+    @property
+    def running_actions(self) -> np.ndarray:
+        return np.flatnonzero(self.action_node[:self.action_count] >= 0)
+
+    def place(self, actions: np.ndarray | int, nodes: np.ndarray | int):
+        actions = np.atleast_1d(actions)
+        nodes = np.broadcast_to(nodes, actions.shape)
+        self.action_node[actions] = nodes
+        self.action_start[actions] = self.simulation.time
+        np.add.at(self.usage_memory, nodes, self.action_memory[actions])
+        np.add.at(self.usage_cpu, nodes, self.action_cpu[actions])
+        np.add.at(self.node_actions, nodes, 1)
+        np.maximum.at(self.node_end, nodes, self.action_start[actions] + self.action_duration[actions])
+
+    def migrate(self, actions: np.ndarray | int, nodes: np.ndarray | int):
+        # running actions move to other nodes, their start and duration are kept
+        actions = np.atleast_1d(actions)
+        nodes = np.broadcast_to(nodes, actions.shape)
+        source = self.action_node[actions]
+        np.subtract.at(self.usage_memory, source, self.action_memory[actions])
+        np.subtract.at(self.usage_cpu, source, self.action_cpu[actions])
+        np.subtract.at(self.node_actions, source, 1)
+        empty = source[self.node_actions[source] == 0]
+        self.usage_memory[empty] = 0
+        self.usage_cpu[empty] = 0
+        self.action_node[actions] = nodes
+        np.add.at(self.usage_memory, nodes, self.action_memory[actions])
+        np.add.at(self.usage_cpu, nodes, self.action_cpu[actions])
+        np.add.at(self.node_actions, nodes, 1)
+        np.maximum.at(self.node_end, nodes, self.action_start[actions] + self.action_duration[actions])
+        self._refresh_end(source)
+
+    def stop(self, actions: np.ndarray | int):
+        actions = np.atleast_1d(actions)
+        actions = actions[self.action_node[actions] >= 0]
+        nodes = self.action_node[actions]
+        np.subtract.at(self.usage_memory, nodes, self.action_memory[actions])
+        np.subtract.at(self.usage_cpu, nodes, self.action_cpu[actions])
+        np.subtract.at(self.node_actions, nodes, 1)
+        self.action_node[actions] = -1
+        empty = nodes[self.node_actions[nodes] == 0]
+        self.usage_memory[empty] = 0
+        self.usage_cpu[empty] = 0
+        self._refresh_end(nodes)
+
+    def revise_actions(self):
+        running = self.running_actions
+        finished = self.action_start[running] + self.action_duration[running] - self.simulation.time <= 0
+        self.stop(running[finished])
+        self.compact()
+
+    def compact(self):
+        # drop finished actions so the action arrays only grow with the live set
+        running = self.running_actions
+        if len(running) == self.action_count:
+            return
+        for name in ('action_memory', 'action_cpu', 'action_start', 'action_duration', 'action_node', 'action_class'):
+            array = getattr(self, name)
+            array[:len(running)] = array[running]
+        self.action_count = len(running)
+
+    def re_config(self, nodes: np.ndarray | None = None):
+        # scale allocations down on over-committed nodes so usage fits the node again
+        nodes = np.arange(self.node_count) if nodes is None else np.atleast_1d(nodes)
+        running = self.running_actions
+        if self.action_classes:
+            over = nodes[
+                (self.usage_memory[nodes] > self.node_memory[nodes]) | (self.usage_cpu[nodes] > self.node_cpu[nodes])
+            ]
+            if not len(over):
+                return
+            affected = running[np.isin(self.action_node[running], over)]
+            action_node = self.action_node[affected]
+            self.action_cpu[affected], self.action_memory[affected] = rescale_resources(
+                self.action_cpu[affected], self.action_memory[affected], action_node,
+                self.node_cpu[:self.node_count], self.node_memory[:self.node_count],
+                self.action_classes, self.action_class[affected]
+            )
+            self.usage_cpu[over] = np.bincount(action_node, self.action_cpu[affected], self.node_count)[over]
+            self.usage_memory[over] = np.bincount(action_node, self.action_memory[affected], self.node_count)[over]
+            self.refresh_durations(affected)
+            return
+        # without classes there is no duration model, allocations are scaled proportionally
+        for usage, capacity, allocation in (
+                (self.usage_memory, self.node_memory, self.action_memory),
+                (self.usage_cpu, self.node_cpu, self.action_cpu),
+        ):
+            over = nodes[usage[nodes] > capacity[nodes]]
+            if not len(over):
+                continue
+            weight = np.ones(self.node_count)
+            weight[over] = capacity[over] / usage[over]
+            affected = running[np.isin(self.action_node[running], over)]
+            allocation[affected] *= weight[self.action_node[affected]]
+            usage[over] = capacity[over]
+            self.refresh_durations(affected)
+
+    def refresh_durations(self, actions: np.ndarray):
+        if not self.action_classes:
+            return
+        for class_id in np.unique(self.action_class[actions]):
+            selected = actions[self.action_class[actions] == class_id]
+            self.action_duration[selected] = self.action_classes[class_id].exec_time(
+                self.action_cpu[selected], self.action_memory[selected]
+            )
+        self._refresh_end(self.action_node[actions[self.action_node[actions] >= 0]])
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+import numpy as np
+
+from online_bin_packing.checkpoint import Checkpointer
+from online_bin_packing.cluster import Cluster
+from online_bin_packing.metrics import MetricsSink
+from online_bin_packing.models import Report
+from online_bin_packing.simulation import Simulation, resolve
+from online_bin_packing.trace import TraceWriter, replay
+from online_bin_packing.workload import ActivationBatch
+
+
+class Algorithm:
+    def __init__(self, name: str, solver: Callable, cluster: bool = False, **kwargs):
+        # solver has to be a module level function so it can be sent to a worker process, of compare or of sweep
+        self.name = name
+        self.solver = solver
+        self.cluster = cluster
+        self.kwargs = kwargs
+
+
+def _run_algorithm(
+        algorithm: Algorithm,
+        trace_path: str,
+        action_classes: list['ActionClass'],
+        simulation: Simulation,
+        checkpoint: Checkpointer | None = None
+) -> list[Report]:
+    return replay(
+        trace_path,
+        algorithm.name,
+        algorithm.solver,
+        nodes=Cluster(simulation=simulation) if algorithm.cluster else [],
+        action_classes=action_classes,
+        simulation=simulation,
+        checkpoint=checkpoint,
+        **algorithm.kwargs
+    )
+
+
+def compare(
+        algorithms: list[Algorithm],
+        workload: ActivationBatch | str,
+        action_classes: list['ActionClass'] | None = None,
+        seed: int = 0,
+        processes: int | None = None,
+        sink: MetricsSink | None = None,
+        simulation: Simulation | None = None,
+        checkpoint_dir: str | None = None,
+        checkpoint_every: int = 100
+) -> dict[str, list[Report]]:
+    """Runs each algorithm over the same activation stream in its own process.
+
+    `workload` is either a batch, which is written to a temporary trace first,
+    or the path of a recorded trace. Every algorithm runs in a fork of
+    `simulation`, with its own clock, node pool and seeded RNG. With a
+    `checkpoint_dir`, each algorithm checkpoints its replay in a directory of its
+    own there every `checkpoint_every` slots, and calling compare again with the
+    same arguments resumes every algorithm from its latest checkpoint.
+    """
+    simulation = resolve(simulation)
+    directory = None
+    if isinstance(workload, ActivationBatch):
+        action_classes = workload.action_classes if action_classes is None else action_classes
+        directory = tempfile.TemporaryDirectory()
+        trace_path = os.path.join(directory.name, 'workload.trace')
+        with TraceWriter(trace_path, [c.name for c in action_classes], simulation.time_slot) as writer:
+            writer.write(workload)
+    else:
+        trace_path = workload
+
+    try:
+        # a worker's seed depends on the algorithm name, not on its position in the list
+        seeds = [np.random.SeedSequence([seed, zlib.crc32(a.name.encode())]).generate_state(1)[0] for a in algorithms]
+        with ProcessPoolExecutor(max_workers=processes or min(len(algorithms), os.cpu_count() or 1)) as pool:
+            futures = {
+                algorithm.name: pool.submit(
+                    _run_algorithm, algorithm, trace_path, action_classes, simulation.fork(int(worker_seed)),
+                    None if checkpoint_dir is None else
+                    Checkpointer(f'{checkpoint_dir}/{algorithm.name}', checkpoint_every)
+                )
+                for algorithm, worker_seed in zip(algorithms, seeds)
+            }
+            results = {name: future.result() for name, future in futures.items()}
+    finally:
+        if directory is not None:
+            directory.cleanup()
+
+    if sink is not None:
+        for name, reports in results.items():
+            if checkpoint_dir is not None:
+                # rows an interrupted run had appended are replaced by the complete ones
+                sink.truncate(name, 0)
+            for report in reports:
+                sink.append(name, report)
+    return results
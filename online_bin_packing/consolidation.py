@@ -0,0 +1,168 @@
+import math
+
+import numpy as np
+
+from online_bin_packing.cluster import Cluster
+from online_bin_packing.models import Node
+from online_bin_packing.simulation import Simulation, resolve
+
+
+class Consolidation:
+    def __init__(self, migrations: int = 0, drained: int = 0, migration_price: float = 0.0, savings: float = 0.0):
+        self.migrations = migrations
+        self.drained = drained
+        self.migration_price = migration_price
+        self.savings = savings
+
+
+class Consolidator:
+    """Drains lightly used nodes by migrating their actions onto the other active nodes.
+
+    Every `every` slots, nodes whose larger of cpu and memory utilization is under
+    `threshold` are tried emptiest first. A node is drained only when all of its
+    actions fit on nodes that stay, and the slots it would still be billed for, until
+    its last action ends, less the slots the receiving nodes are billed for longer
+    because a moved action outlives them, are worth more than `migration_cost` time
+    slots of the drained node per moved action. Every node is priced at its own
+    shape's price. Actions go to nodes that already outlive them first, then to the
+    ones whose longer billing costs the least. At most `max_migrations` actions move
+    per pass. Moved actions keep their start and duration, and nodes that received
+    actions are not drained in the same pass.
+    """
+
+    def __init__(
+            self,
+            threshold: float = 0.5,
+            max_migrations: int = 16,
+            migration_cost: float = 0.25,
+            every: int = 1
+    ):
+        self.threshold = threshold
+        self.max_migrations = max_migrations
+        self.migration_cost = migration_cost
+        self.every = every
+        self._calls = 0
+
+    def plan(
+            self,
+            free_cpu: np.ndarray,
+            free_memory: np.ndarray,
+            node_cpu: np.ndarray,
+            node_memory: np.ndarray,
+            time_to_end: np.ndarray,
+            node_price: np.ndarray,
+            action_node: np.ndarray,
+            action_cpu: np.ndarray,
+            action_memory: np.ndarray,
+            action_time_to_end: np.ndarray,
+            simulation: Simulation
+    ) -> tuple[np.ndarray, np.ndarray, Consolidation]:
+        """Picks the nodes to drain, returns the target node of every action (-1 stays) and the drained nodes."""
+        free_cpu, free_memory = free_cpu.astype(float), free_memory.astype(float)
+        target = np.full(len(action_node), -1, dtype=np.int64)
+        result = Consolidation()
+        utilization = np.maximum(1 - free_cpu / node_cpu, 1 - free_memory / node_memory)
+        # only nodes with running actions take part, idle nodes are left to the provisioner
+        open_ = np.bincount(action_node, minlength=len(node_cpu)) > 0
+        candidates = np.flatnonzero(open_ & (utilization < self.threshold))
+        kept = np.zeros(len(node_cpu), dtype=bool)
+        # node time to end as moves are committed, a node is billed for the slots until its last action ends
+        end = np.maximum(time_to_end.astype(float), 0)
+        drained = []
+        budget = self.max_migrations
+        for node in candidates[np.argsort(utilization[candidates], kind='stable')]:
+            if kept[node]:
+                continue
+            actions = np.flatnonzero(action_node == node)
+            if len(actions) > budget:
+                continue
+            cost = len(actions) * self.migration_cost * node_price[node]
+
+            allowed = open_.copy()
+            allowed[node] = False
+            cpu, memory, ends = free_cpu.copy(), free_memory.copy(), end.copy()
+            moves = []
+            # largest first, each onto the node whose extension costs the least, then the one it leaves the least
+            # room on; any extension outweighs the room left
+            size = action_cpu[actions] / node_cpu[node] + action_memory[actions] / node_memory[node]
+            for action in actions[np.argsort(-size, kind='stable')]:
+                fits = allowed & (cpu >= action_cpu[action]) & (memory >= action_memory[action])
+                if not fits.any():
+                    break
+                extension = np.ceil(np.maximum(action_time_to_end[action] - ends, 0) / simulation.time_slot)
+                left = (cpu - action_cpu[action]) / node_cpu + (memory - action_memory[action]) / node_memory
+                extension_price = 3 * extension * node_price / node_price.min()
+                j = int(np.argmin(np.where(fits, extension_price + left, np.inf)))
+                cpu[j] -= action_cpu[action]
+                memory[j] -= action_memory[action]
+                ends[j] = max(ends[j], action_time_to_end[action])
+                moves.append((action, j))
+            if len(moves) < len(actions):
+                continue
+            # the drained node's remaining slots, less the slots the receiving nodes now run longer
+            extension = np.ceil(ends / simulation.time_slot) - np.ceil(end / simulation.time_slot)
+            savings = math.ceil(end[node] / simulation.time_slot) * node_price[node] - float(extension @ node_price)
+            if savings <= cost:
+                continue
+
+            for action, j in moves:
+                target[action] = j
+                # a node that took actions is kept for this pass
+                kept[j] = True
+            free_cpu, free_memory, end = cpu, memory, ends
+            free_cpu[node], free_memory[node], end[node] = node_cpu[node], node_memory[node], 0
+            open_[node] = False
+            drained.append(node)
+            budget -= len(actions)
+            result.migrations += len(actions)
+            result.migration_price += cost
+            result.savings += savings
+        result.drained = len(drained)
+        return target, np.array(drained, dtype=np.int64), result
+
+    def consolidate(
+            self,
+            nodes: list[Node] | Cluster,
+            simulation: Simulation | None = None
+    ) -> tuple[list[Node] | Cluster, Consolidation]:
+        """Migrates the actions of the drained nodes and releases them."""
+        simulation = resolve(simulation, nodes)
+        self._calls += 1
+        if (self._calls - 1) % self.every:
+            return nodes, Consolidation()
+
+        if isinstance(nodes, Cluster):
+            running = nodes.running_actions
+            count = nodes.node_count
+            price = np.array([shape.price_time_slot(simulation.time_slot) for shape in simulation.catalog])
+            target, drained, result = self.plan(
+                nodes.free_cpu, nodes.free_memory, nodes.node_cpu[:count], nodes.node_memory[:count],
+                nodes.time_to_end(), price[nodes.node_shape[:count]], nodes.action_node[running],
+                nodes.action_cpu[running], nodes.action_memory[running],
+                nodes.action_start[running] + nodes.action_duration[running] - simulation.time, simulation
+            )
+            moved = target >= 0
+            if moved.any():
+                nodes.migrate(running[moved], target[moved])
+                nodes.release(drained)
+            return nodes, result
+
+        actions = [a for n in nodes for a in n.actions]
+        target, drained, result = self.plan(
+            np.array([n.free_cpu for n in nodes], dtype=float),
+            np.array([n.free_memory for n in nodes], dtype=float),
+            np.array([n.cpu for n in nodes], dtype=float),
+            np.array([n.memory for n in nodes], dtype=float),
+            np.array([n.time_to_end for n in nodes], dtype=float),
+            np.array([n.shape.price_time_slot(simulation.time_slot) for n in nodes], dtype=float),
+            np.repeat(np.arange(len(nodes)), [len(n.actions) for n in nodes]),
+            np.array([a.cpu for a in actions], dtype=float),
+            np.array([a.memory for a in actions], dtype=float),
+            np.array([a.time_to_end for a in actions], dtype=float),
+            simulation
+        )
+        for action, j in zip(actions, target.tolist()):
+            if j >= 0:
+                action.migrate(nodes[j])
+        drained = set(drained.tolist())
+        return [n for k, n in enumerate(nodes) if k not in drained], result
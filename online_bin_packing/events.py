@@ -0,0 +1,144 @@
+import heapq
+import itertools
+from enum import Enum
+from typing import Callable
+
+from online_bin_packing.models import Action, Node, Report, SolveInfo
+from online_bin_packing.simulation import Simulation
+from online_bin_packing.utils import call_solver
+from online_bin_packing.workload import ActivationBatch
+
+# completions are re-checked against the action itself, so float noise must not reschedule them forever
+EPSILON = 1e-9
+
+# default of EventSimulator's time_slot, the slot of the simulation it drives
+_SIMULATION_TIME_SLOT = object()
+
+
+class EventType(Enum):
+    # events at the same time run in this order: finished actions free room before new arrivals are placed
+    COMPLETION = 0
+    NODE_RELEASE = 1
+    ARRIVAL = 2
+
+
+class EventSimulator:
+    """Discrete-event driver for one solver.
+
+    Completions are kept in a heap keyed by end time, so each step only touches
+    the actions that actually finish instead of revising every node per slot.
+    """
+
+    def __init__(
+            self,
+            algorithm_name: str,
+            solver: Callable,
+            time_slot: float | None = _SIMULATION_TIME_SLOT,
+            simulation: Simulation | None = None,
+            **kwargs
+    ):
+        self.algorithm_name = algorithm_name
+        self.solver = solver
+        self.kwargs = kwargs
+        # every simulator owns its clock and node pool unless it is handed a simulation to drive
+        self.simulation = Simulation() if simulation is None else simulation
+        # slot reports follow the simulation's time slot unless given one, None turns them off
+        self.time_slot = self.simulation.time_slot if time_slot is _SIMULATION_TIME_SLOT else time_slot
+        self.reports: list[Report] = []
+        self.solve_infos: list[SolveInfo] = []
+        self.events: list[tuple[float, int, int, EventType, object]] = []
+        self.processed: dict[EventType, int] = {event_type: 0 for event_type in EventType}
+        self._sequence = itertools.count()
+        self._next_report = self.time
+
+    @property
+    def time(self) -> float:
+        return self.simulation.time
+
+    @property
+    def nodes(self) -> list[Node]:
+        return self.simulation.nodes
+
+    @nodes.setter
+    def nodes(self, nodes: list[Node]):
+        self.simulation.nodes = nodes
+
+    def schedule(self, time: float, event_type: EventType, payload=None):
+        heapq.heappush(self.events, (time, event_type.value, next(self._sequence), event_type, payload))
+
+    def submit(self, activations: list[Action] | ActivationBatch, time: float | None = None):
+        if isinstance(activations, ActivationBatch):
+            activations = activations.to_actions()
+        if activations:
+            self.schedule(self.time if time is None else time, EventType.ARRIVAL, [a.copy() for a in activations])
+
+    def run(self, until: float):
+        while self.events and self.events[0][0] <= until:
+            event_time = self.events[0][0]
+            self._report_until(event_time)
+            _, _, _, event_type, payload = heapq.heappop(self.events)
+            self._advance(event_time)
+            self.processed[event_type] += 1
+            if event_type == EventType.ARRIVAL:
+                self._on_arrival(payload)
+            elif event_type == EventType.COMPLETION:
+                self._on_completion(payload)
+            elif event_type == EventType.NODE_RELEASE:
+                self._on_node_release(payload)
+        self._report_until(until, inclusive=True)
+        self._advance(until)
+
+    def _advance(self, time: float):
+        self.simulation.time = max(self.simulation.time, time)
+
+    def _report_until(self, time: float, inclusive: bool = False):
+        # slot view: one report per slot boundary, taken once every event up to that boundary has run
+        if self.time_slot is None:
+            return
+        while self._next_report < time or (inclusive and self._next_report <= time):
+            self._advance(self._next_report)
+            if any(node.actions for node in self.nodes):
+                self.reports.append(Report(
+                    self.algorithm_name, [n for n in self.nodes if n.actions], solve_info=self._slot_solve_info(),
+                    simulation=self.simulation
+                ))
+            self._next_report += self.time_slot
+
+    def _slot_solve_info(self) -> SolveInfo:
+        # fold the solves of the arrivals since the previous report into one record for the slot
+        slot_info = SolveInfo()
+        statuses = {solve_info.status for solve_info in self.solve_infos} - {None}
+        if statuses:
+            # the worst status of the slot wins, a failed solve before one that ran out of time
+            slot_info.status = next(status for status in ('error', 'feasible', 'optimal') if status in statuses)
+            slot_info.gap = max(solve_info.gap or 0.0 for solve_info in self.solve_infos)
+        for solve_info in self.solve_infos:
+            slot_info.time += solve_info.time
+            slot_info.solves += solve_info.solves
+        self.solve_infos = []
+        return slot_info
+
+    def _on_arrival(self, activations: list[Action]):
+        self.nodes, solve_info = call_solver(
+            self.solver, activations=activations, nodes=self.nodes, simulation=self.simulation, **self.kwargs
+        )
+        self.solve_infos.append(solve_info)
+        for action in activations:
+            if action.node is not None:
+                self.schedule(action.start_time + action.duration, EventType.COMPLETION, action)
+
+    def _on_completion(self, action: Action):
+        node = action.node
+        if node is None or action not in node.actions:
+            return
+        if action.time_to_end > EPSILON:
+            # the action was re-configured after it was placed, so its end time moved
+            self.schedule(action.start_time + action.duration, EventType.COMPLETION, action)
+            return
+        node.stop_action(action)
+        if not node.actions:
+            self.schedule(self.time, EventType.NODE_RELEASE, node)
+
+    def _on_node_release(self, node: Node):
+        if not node.actions and node in self.nodes:
+            self.nodes.remove(node)
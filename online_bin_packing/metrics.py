@@ -0,0 +1,149 @@
+import csv
+import os
+
+import numpy as np
+from matplotlib import pyplot as plt
+
+from online_bin_packing.checkpoint import atomic_write
+from online_bin_packing.models import Report
+from online_bin_packing.system import result_dir
+
+FIELDS = (
+    'time', 'node_count', 'cpu_utilization', 'memory_utilization', 'price', 'cpu_waste_price', 'memory_waste_price',
+    'solve_status', 'solve_gap', 'solve_time', 'solves', 'warm_count', 'warm_price', 'cold_starts',
+    'migrations', 'drained', 'migration_price', 'consolidation_savings', 'shapes',
+)
+
+
+def render(algorithm_name: str, columns: dict[str, np.ndarray], path_to_file: str) -> None:
+    if not os.path.exists(path_to_file):
+        os.makedirs(path_to_file)
+    x = columns['time']
+    plt.plot(x, columns['node_count'])
+    plt.xlabel('time (s)')
+    plt.ylabel('vm count')
+    plt.title(algorithm_name)
+    plt.savefig(f'{path_to_file}/pod_count')
+    plt.close()
+
+    plt.plot(x, columns['cpu_utilization'])
+    plt.xlabel('time (s)')
+    plt.ylabel('cpu utilization')
+    plt.title(algorithm_name)
+    plt.savefig(f'{path_to_file}/cpu_utilization')
+    plt.close()
+
+    plt.plot(x, columns['memory_utilization'])
+    plt.xlabel('time (s)')
+    plt.ylabel('memory utilization')
+    plt.title(algorithm_name)
+    plt.savefig(f'{path_to_file}/memory_utilization')
+    plt.close()
+
+    plt.plot(x, np.cumsum(columns['price']))
+    plt.xlabel('time (s)')
+    plt.ylabel('cost ($)')
+    plt.title(algorithm_name)
+    plt.savefig(f'{path_to_file}/cost')
+    plt.close()
+
+
+def report_row(report: Report) -> dict:
+    return {
+        'time': report.time,
+        'node_count': report.node_count,
+        'cpu_utilization': report.cpu_utilization,
+        'memory_utilization': report.memory_utilization,
+        'price': report.price,
+        'cpu_waste_price': report.cpu_waste_price,
+        'memory_waste_price': report.memory_waste_price,
+        'solve_status': report.solve_info.status or '',
+        'solve_gap': np.nan if report.solve_info.gap is None else report.solve_info.gap,
+        'solve_time': report.solve_info.time,
+        'solves': report.solve_info.solves,
+        'warm_count': report.warm_count,
+        'warm_price': report.warm_price,
+        'cold_starts': report.cold_starts,
+        'migrations': report.migrations,
+        'drained': report.drained,
+        'migration_price': report.migration_price,
+        'consolidation_savings': report.consolidation_savings,
+        # node count per shape, e.g. 'general:3 memory:1'
+        'shapes': ' '.join(f'{name}:{shape["node_count"]}' for name, shape in report.shapes.items()),
+    }
+
+
+class MetricsSink:
+    """Append-only per-algorithm CSV of report fields, plotted once at the end.
+
+    With `live_every` set, an algorithm's figures are also refreshed every that
+    many appended slots.
+    """
+
+    def __init__(self, directory: str = f'{result_dir}/solver', live_every: int | None = None):
+        self.directory = directory
+        self.live_every = live_every
+        self._files = {}
+        self._writers = {}
+        self._rows: dict[str, int] = {}
+
+    def path(self, algorithm_name: str) -> str:
+        return f'{self.directory}/{algorithm_name}'
+
+    def append(self, algorithm_name: str, report: Report) -> None:
+        if algorithm_name not in self._writers:
+            path_to_file = self.path(algorithm_name)
+            if not os.path.exists(path_to_file):
+                os.makedirs(path_to_file)
+            exists = os.path.exists(f'{path_to_file}/metrics.csv')
+            self._files[algorithm_name] = open(f'{path_to_file}/metrics.csv', 'a', newline='')
+            self._writers[algorithm_name] = csv.DictWriter(self._files[algorithm_name], fieldnames=FIELDS)
+            if not exists:
+                self._writers[algorithm_name].writeheader()
+            self._rows.setdefault(algorithm_name, 0)
+        self._writers[algorithm_name].writerow(report_row(report))
+        self._rows[algorithm_name] += 1
+        if self.live_every and self._rows[algorithm_name] % self.live_every == 0:
+            self.render(algorithm_name)
+
+    def truncate(self, algorithm_name: str, rows: int) -> None:
+        """Keeps the first `rows` rows of an algorithm's CSV, e.g. the ones a resumed run's checkpoint covers."""
+        if algorithm_name in self._files:
+            self._files.pop(algorithm_name).close()
+            del self._writers[algorithm_name]
+        path = f'{self.path(algorithm_name)}/metrics.csv'
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                lines = f.readlines()[:rows + 1]
+            atomic_write(path, b''.join(lines))
+        self._rows[algorithm_name] = rows
+
+    def read(self, algorithm_name: str) -> dict[str, np.ndarray]:
+        if algorithm_name in self._files:
+            self._files[algorithm_name].flush()
+        with open(f'{self.path(algorithm_name)}/metrics.csv', newline='') as f:
+            rows = list(csv.DictReader(f))
+        columns = {}
+        for field in FIELDS:
+            values = [row[field] for row in rows]
+            try:
+                columns[field] = np.array(values, dtype=float)
+            except ValueError:
+                columns[field] = np.array(values)
+        return columns
+
+    def algorithms(self) -> list[str]:
+        if not os.path.exists(self.directory):
+            return []
+        return sorted(
+            name for name in os.listdir(self.directory) if os.path.exists(f'{self.path(name)}/metrics.csv')
+        )
+
+    def render(self, algorithm_name: str | None = None) -> None:
+        for name in [algorithm_name] if algorithm_name else self.algorithms():
+            render(name, self.read(name), self.path(name))
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+        self._files, self._writers = {}, {}
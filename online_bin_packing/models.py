@@ -1,23 +1,41 @@
-import copy
+import numpy as np
 
-from online_bin_packing import system
-from online_bin_packing.system import NODE_PRICE_TIME_SLOT
+from online_bin_packing.catalog import NodeShape
+from online_bin_packing.cluster import Cluster
+from online_bin_packing.simulation import Simulation, default_simulation, resolve
 
 
 class Action:
-    def __init__(self, action_class: 'ActionClass'):
+    def __init__(self, action_class: 'ActionClass', cpu: float | None = None, memory: int | None = None):
         self.action_class: 'ActionClass' = action_class
-        self.memory: int = self.action_class.best_memory
-        self.cpu: float = self.action_class.best_cpu
+        self.memory: int = self.action_class.best_memory if memory is None else memory
+        self.cpu: float = self.action_class.best_cpu if cpu is None else cpu
         self.start_time: int | None = None
         self.node: Node | None = None
+        # actions that run the class's best config reuse the duration the class already knows
+        self._duration: float | None = None
+        if cpu is None and memory is None:
+            self._duration = self.action_class.duration_of_best_config
+
+    def copy(self) -> 'Action':
+        # the action class is shared, only the per-action state is copied
+        action = Action.__new__(Action)
+        action.__dict__.update(self.__dict__)
+        action.node = None
+        return action
 
     def add_to_node(self, node: 'Node'):
         self.node = node
-        self.start_time = system.SYSTEM_TIME
+        self.start_time = node.simulation.time
 
         self.node.start_action(action=self)
 
+    def migrate(self, node: 'Node'):
+        # keeps its start time and duration, only the node it runs on changes
+        self.node.stop_action(self)
+        self.node = node
+        node.start_action(action=self)
+
     def __str__(self):
         return f'[{self.action_class.name}], ({self.cpu}, {self.memory}), {self.duration}'
 
@@ -25,26 +43,52 @@ class Action:
     def stop(self) -> bool:
         return self.time_to_end <= 0
 
+    @property
+    def end_time(self) -> float:
+        return self.start_time + self.duration
+
     @property
     def time_to_end(self) -> float:
-        return self.start_time + self.duration - system.SYSTEM_TIME
+        return self.end_time - self.node.simulation.time
 
     @property
     def duration(self) -> float:
-        return self.action_class.exec_time(self.cpu, self.memory)
+        # only re-evaluated after the allocation changes
+        if self._duration is None:
+            self._duration = float(self.action_class.exec_time(self.cpu, self.memory))
+        return self._duration
+
+    def resize(self, cpu: float | None = None, memory: float | None = None):
+        self.cpu = self.cpu if cpu is None else cpu
+        self.memory = self.memory if memory is None else memory
+        self._changed()
+
+    def _changed(self):
+        # the duration follows the allocation, and the node's end time follows the duration
+        self._duration = None
+        if self.node is not None:
+            self.node._end_time = None
 
     def revise(self, wight: float, config_type: str):
         if config_type == 'cpu':
             self.cpu *= wight
         elif config_type == 'memory':
             self.memory *= wight
+        self._changed()
 
 
 class Node:
-    def __init__(self, memory: int, cpu: float):
+    def __init__(
+            self, memory: int, cpu: float, simulation: Simulation | None = None, shape: NodeShape | None = None
+    ):
         self.memory: int = memory
         self.cpu: float = cpu
+        self.simulation: Simulation = default_simulation if simulation is None else simulation
+        # a node built without a shape is billed as the simulation's default shape
+        self.shape: NodeShape = self.simulation.catalog[0] if shape is None else shape
         self.actions = []
+        # latest end time of the running actions, raised on start and recomputed lazily after a stop
+        self._end_time: float | None = None
 
     def cpu_utilization(self) -> float:
         return round(self.usage_cpu / (self.usage_cpu + self.free_cpu), 2)
@@ -54,9 +98,13 @@ class Node:
 
     def start_action(self, action: Action):
         self.actions.append(action)
+        if self._end_time is not None:
+            self._end_time = max(self._end_time, action.end_time)
 
     def stop_action(self, action: Action):
         self.actions.remove(action)
+        if self._end_time is not None and action.end_time >= self._end_time:
+            self._end_time = None
 
     def __str__(self):
         return f'{self.memory_utilization()}, {self.cpu_utilization()}'
@@ -65,7 +113,7 @@ class Node:
         return self.free_cpu >= activation.cpu and self.free_memory >= activation.memory
 
     def revise_actions(self):
-        for action in self.actions:
+        for action in list(self.actions):
             if action.stop:
                 self.stop_action(action)
 
@@ -85,9 +133,15 @@ class Node:
     def free_memory(self) -> float:
         return self.memory - self.usage_memory
 
+    @property
+    def end_time(self) -> float:
+        if self._end_time is None:
+            self._end_time = max([a.end_time for a in self.actions], default=-np.inf)
+        return self._end_time
+
     @property
     def time_to_end(self) -> float:
-        return max([a.time_to_end for a in self.actions])
+        return self.end_time - self.simulation.time if self.actions else 0
 
     def re_config_cpu(self):
         w_cpu = self.cpu / self.usage_cpu
@@ -100,22 +154,80 @@ class Node:
             a.revise(w_memory, 'memory')
 
 
+class SolveInfo:
+    def __init__(self):
+        self.status: str | None = None
+        self.gap: float | None = None
+        self.time: float = 0
+        self.solves: int = 0
+
+
 class Report:
 
-    def __init__(self, algorithm: str, nodes: list[Node]):
-        self.time = system.SYSTEM_TIME
-        self.nodes = copy.deepcopy(nodes)
+    def __init__(
+            self,
+            algorithm: str,
+            nodes: list[Node] | Cluster,
+            solve_info: SolveInfo | None = None,
+            simulation: Simulation | None = None,
+            warm_count: int = 0,
+            warm_price: float = 0,
+            cold_starts: int = 0,
+            consolidation: 'Consolidation | None' = None
+    ):
+        simulation = resolve(simulation, nodes)
+        self.time = simulation.time
         self.algorithm = algorithm
-
-        all_memory_usage = 0
-        all_cpu_usage = 0
-        for index, node in enumerate(nodes):
-            # print(index + 1, node)
-            all_memory_usage += node.memory_utilization()
-            all_cpu_usage += node.cpu_utilization()
-        self.cpu_utilization = all_cpu_usage / len(nodes)
-        self.memory_utilization = all_memory_usage / len(nodes)
-
-        self.price = NODE_PRICE_TIME_SLOT * len(nodes)
-        self.cpu_waste_price = (1 - self.cpu_utilization) * self.price
-        self.memory_waste_price = (1 - self.memory_utilization) * self.price
+        self.solve_info = SolveInfo() if solve_info is None else solve_info
+        # per phase times and call counts of the slot, filled by run_solver when profiling is enabled
+        self.profile: dict[str, float] = {}
+
+        # per node snapshot of usage and capacity instead of a copy of the node objects
+        if isinstance(nodes, Cluster):
+            active = nodes.active_nodes
+            self.usage_cpu = nodes.usage_cpu[active].copy()
+            self.usage_memory = nodes.usage_memory[active].copy()
+            self.capacity_cpu = nodes.node_cpu[active].copy()
+            self.capacity_memory = nodes.node_memory[active].copy()
+            shapes = [nodes.simulation.catalog[k] for k in nodes.node_shape[active].tolist()]
+        else:
+            self.usage_cpu = np.array([node.usage_cpu for node in nodes], dtype=float)
+            self.usage_memory = np.array([node.usage_memory for node in nodes], dtype=float)
+            self.capacity_cpu = np.array([node.cpu for node in nodes], dtype=float)
+            self.capacity_memory = np.array([node.memory for node in nodes], dtype=float)
+            shapes = [node.shape for node in nodes]
+        self.shape = np.array([shape.name for shape in shapes], dtype=str)
+        self.node_price = np.array([shape.price_time_slot(simulation.time_slot) for shape in shapes], dtype=float)
+
+        self.node_count = len(self.usage_cpu)
+        cpu_utilization = np.round(self.usage_cpu / self.capacity_cpu, 2)
+        memory_utilization = np.round(self.usage_memory / self.capacity_memory, 2)
+        self.cpu_utilization = cpu_utilization.sum() / max(self.node_count, 1)
+        self.memory_utilization = memory_utilization.sum() / max(self.node_count, 1)
+
+        # every node's idle share is billed at its own shape's price
+        self.price = self.node_price.sum()
+        self.cpu_waste_price = ((1 - cpu_utilization) * self.node_price).sum()
+        self.memory_waste_price = ((1 - memory_utilization) * self.node_price).sum()
+        self.shapes: dict[str, dict[str, float]] = {}
+        for name in dict.fromkeys(self.shape.tolist()):
+            selected = self.shape == name
+            self.shapes[name] = {
+                'node_count': int(selected.sum()),
+                'price': self.node_price[selected].sum(),
+                'cpu_utilization': cpu_utilization[selected].mean(),
+                'memory_utilization': memory_utilization[selected].mean(),
+                'cpu_waste_price': ((1 - cpu_utilization[selected]) * self.node_price[selected]).sum(),
+                'memory_waste_price': ((1 - memory_utilization[selected]) * self.node_price[selected]).sum(),
+            }
+
+        # idle nodes held for the next slot are billed apart from the nodes doing work
+        self.warm_count = warm_count
+        self.warm_price = warm_price
+        self.cold_starts = cold_starts
+
+        # actions moved off drained nodes, what the moves cost and the node time they are expected to save
+        self.migrations = 0 if consolidation is None else consolidation.migrations
+        self.drained = 0 if consolidation is None else consolidation.drained
+        self.migration_price = 0.0 if consolidation is None else consolidation.migration_price
+        self.consolidation_savings = 0.0 if consolidation is None else consolidation.savings
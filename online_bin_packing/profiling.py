@@ -0,0 +1,118 @@
+import csv
+import os
+from contextlib import nullcontext
+from time import perf_counter
+
+import numpy as np
+
+# one shared no-op context, a disabled profiler costs a method call per hook
+_DISABLED = nullcontext()
+
+
+class _Phase:
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *exc):
+        times = self.profiler.times
+        times[self.name] = times.get(self.name, 0.0) + perf_counter() - self.start
+
+
+class Profiler:
+    """Wall time per phase and call counts, collected per slot.
+
+    Phases are opened with `with profiler.phase(name)` around the stages of
+    `run_solver` and `bin_packing`. Hot property counting patches the property
+    getters on the classes once for the whole process, every profiler counting
+    properties sees every call, and it costs nothing until enabled.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.times: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return _DISABLED
+        return _Phase(self, name)
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def take(self) -> dict[str, float]:
+        # what was collected since the last call, the slot's report keeps it
+        profile = {**self.times, **self.counts}
+        self.times, self.counts = {}, {}
+        return profile
+
+    def enable(self, properties: bool = False):
+        self.enabled = True
+        if properties and self not in _COUNTING:
+            if not _COUNTING:
+                _patch()
+            _COUNTING.append(self)
+
+    def disable(self):
+        self.enabled = False
+        if self in _COUNTING:
+            _COUNTING.remove(self)
+            if not _COUNTING:
+                _unpatch()
+
+
+# the property getters are patched once for the whole process, the originals are kept here
+# and every profiler counting properties is listed, the last one to stop restores them
+_ORIGINALS: dict[tuple[type, str], property] = {}
+_COUNTING: list[Profiler] = []
+
+
+def _patch():
+    from online_bin_packing.cluster import Cluster
+    from online_bin_packing.models import Action, Node
+
+    for cls in (Node, Action, Cluster):
+        for name, value in list(vars(cls).items()):
+            if isinstance(value, property):
+                _ORIGINALS[cls, name] = value
+                setattr(cls, name, _counted(f'{cls.__name__}.{name}', value))
+
+
+def _unpatch():
+    for (cls, name), original in _ORIGINALS.items():
+        setattr(cls, name, original)
+    _ORIGINALS.clear()
+
+
+def _counted(name: str, original: property) -> property:
+    getter = original.fget
+
+    def fget(obj):
+        for profiler in _COUNTING:
+            profiler.counts[name] = profiler.counts.get(name, 0) + 1
+        return getter(obj)
+
+    return property(fget, original.fset, original.fdel)
+
+
+def profile_table(reports: list['Report']) -> dict[str, np.ndarray]:
+    # one row per report, phases or counters a slot did not hit are zero
+    columns = sorted({name for report in reports for name in report.profile})
+    table = {'time': np.array([report.time for report in reports], dtype=float)}
+    for name in columns:
+        table[name] = np.array([report.profile.get(name, 0) for report in reports], dtype=float)
+    return table
+
+
+def write_profile(path: str, reports: list['Report']) -> None:
+    table = profile_table(reports)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(list(table))
+        writer.writerows(zip(*(column.tolist() for column in table.values())))
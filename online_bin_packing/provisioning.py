@@ -0,0 +1,120 @@
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+from online_bin_packing.catalog import choose_shape
+from online_bin_packing.cluster import Cluster
+from online_bin_packing.models import Action, Node
+from online_bin_packing.simulation import Simulation, resolve
+from online_bin_packing.workload import ActivationBatch
+
+
+class Provisioner:
+    """Keeps a warm pool of idle nodes sized for the next slot's forecast demand.
+
+    Each class's arrivals per slot start from its gamma arrival model, mean
+    `inter_arrival_mean` and variance 1, and follow the observed counts through
+    an exponentially weighted mean and variance. The pool covers the cpu and
+    memory demand the next slot stays under with probability `service_level`,
+    less the room left on the active nodes. A higher service level means fewer
+    nodes are opened while requests wait, and more idle nodes are paid for. Zero
+    turns the pool off. The pool's nodes take the catalog shape that best serves
+    the running and forecast demand, idle nodes of other shapes go first when the
+    pool shrinks.
+    """
+
+    def __init__(
+            self,
+            action_classes: list['ActionClass'],
+            service_level: float = 0.9,
+            smoothing: float = 0.2,
+            max_warm: int | None = None
+    ):
+        if not 0 <= service_level < 1:
+            raise ValueError(f'service_level has to be in [0, 1), got {service_level}')
+        self.action_classes = action_classes
+        self.service_level = service_level
+        self.smoothing = smoothing
+        self.max_warm = max_warm
+        self._index = {c.name: k for k, c in enumerate(action_classes)}
+        self.mean = np.array([c.inter_arrival_mean for c in action_classes], dtype=float)
+        self.variance = np.ones(len(action_classes))
+        self.cpu = np.array([c.best_cpu for c in action_classes], dtype=float)
+        self.memory = np.array([c.best_memory for c in action_classes], dtype=float)
+
+    def observe(self, activations: list[Action] | ActivationBatch):
+        if isinstance(activations, ActivationBatch):
+            classes = [self._index[c.name] for c in activations.action_classes]
+            counts = np.bincount(np.asarray(classes, dtype=np.int64)[activations.class_id], minlength=len(self.mean))
+        else:
+            classes = [self._index[a.action_class.name] for a in activations]
+            counts = np.bincount(np.asarray(classes, dtype=np.int64), minlength=len(self.mean))
+        delta = counts - self.mean
+        self.mean += self.smoothing * delta
+        self.variance = (1 - self.smoothing) * (self.variance + self.smoothing * delta ** 2)
+
+    def forecast(self) -> tuple[float, float]:
+        # cpu and memory demand of the next slot at the service level, normal approximation of the sum
+        z = NormalDist().inv_cdf(self.service_level) if self.service_level > 0 else 0.0
+        cpu = self.mean @ self.cpu + z * math.sqrt(self.variance @ self.cpu ** 2)
+        memory = self.mean @ self.memory + z * math.sqrt(self.variance @ self.memory ** 2)
+        return max(cpu, 0.0), max(memory, 0.0)
+
+    def target(
+            self,
+            free_cpu: float,
+            free_memory: float,
+            simulation: Simulation,
+            used_cpu: float = 0,
+            used_memory: float = 0
+    ) -> tuple[int, int]:
+        # pool size and the catalog index of its shape, one that fits every class
+        if self.service_level == 0:
+            return 0, 0
+        cpu, memory = self.forecast()
+        shape = choose_shape(
+            simulation.catalog, used_memory + memory, used_cpu + cpu,
+            self.memory.max(initial=0), self.cpu.max(initial=0)
+        )
+        node = simulation.catalog[shape]
+        nodes = math.ceil(max((cpu - free_cpu) / node.cpu, (memory - free_memory) / node.memory, 0))
+        return (nodes if self.max_warm is None else min(nodes, self.max_warm)), shape
+
+    def provision(
+            self,
+            nodes: list[Node] | Cluster,
+            simulation: Simulation | None = None
+    ) -> tuple[list[Node] | Cluster, int, float]:
+        """Trims or tops up the idle nodes to the warm pool target.
+
+        Returns the nodes, the pool size and what the pool costs for a slot.
+        """
+        simulation = resolve(simulation, nodes)
+        price = [shape.price_time_slot(simulation.time_slot) for shape in simulation.catalog]
+        if isinstance(nodes, Cluster):
+            active = nodes.active_nodes
+            idle = np.flatnonzero(nodes.node_actions[:nodes.node_count] == 0)
+            warm, shape = self.target(
+                float(nodes.free_cpu[active].sum()), float(nodes.free_memory[active].sum()), simulation,
+                float(nodes.usage_cpu[active].sum()), float(nodes.usage_memory[active].sum())
+            )
+            # idle nodes of the pool's shape are kept first
+            idle = idle[np.argsort(nodes.node_shape[idle] != shape, kind='stable')]
+            warm_price = sum(price[k] for k in nodes.node_shape[idle[:warm]].tolist())
+            warm_price += max(warm - len(idle), 0) * price[shape]
+            if len(idle) > warm:
+                nodes.release(idle[warm:])
+            elif len(idle) < warm:
+                nodes.add_nodes(warm - len(idle), shape=shape)
+            return nodes, warm, warm_price
+
+        active = [n for n in nodes if n.actions]
+        idle = [n for n in nodes if not n.actions]
+        warm, shape = self.target(
+            sum(n.free_cpu for n in active), sum(n.free_memory for n in active), simulation,
+            sum(n.usage_cpu for n in active), sum(n.usage_memory for n in active)
+        )
+        idle = sorted(idle, key=lambda n: n.shape is not simulation.catalog[shape])
+        idle = idle[:warm] + [simulation.new_node(shape) for _ in range(warm - len(idle))]
+        return active + idle, warm, sum(n.shape.price_time_slot(simulation.time_slot) for n in idle)
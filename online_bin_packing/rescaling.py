@@ -0,0 +1,142 @@
+import numpy as np
+
+from online_bin_packing.system import MIN_CPU_ACTION, MIN_MEMORY_ACTION
+
+# bisection steps on the log of the multiplier, far below float resolution of the allocations
+STEPS = 64
+
+
+def rescale(
+        allocation: np.ndarray,
+        node: np.ndarray,
+        capacity: np.ndarray,
+        minimum: float,
+        offset: np.ndarray,
+        rate: np.ndarray,
+        scale: np.ndarray
+) -> np.ndarray:
+    """Shrinks the allocations of over-committed nodes to their capacity, all nodes at once.
+
+    Item i's duration is scale_i * rate_i ** (x - offset_i) plus a constant, which
+    is convex in its allocation x. The total duration increase on a node is
+    minimized by the KKT point where every item's marginal duration equals the
+    node's multiplier, found by bisection on all nodes together. Allocations only
+    shrink and stay at or above `minimum`. A node whose minimums do not fit is
+    scaled down proportionally below them.
+    """
+    allocation = np.asarray(allocation, dtype=float)
+    usage = np.bincount(node, allocation, len(capacity))
+    over = usage > capacity * (1 + 1e-12)
+    items = np.flatnonzero(over[node])
+    if not len(items):
+        return allocation.copy()
+
+    upper = allocation[items]
+    lower = np.minimum(minimum, upper)
+    nodes = node[items]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_rate = np.log(rate[items])
+        slope = scale[items] * -log_rate
+        # an item whose duration does not depend on the allocation only gives room
+        indifferent = ~(slope > 0) | ~(log_rate < 0)
+        marginal_upper = np.where(indifferent, np.inf, np.log(slope) + log_rate * (upper - offset[items]))
+        marginal_lower = np.where(indifferent, -np.inf, np.log(slope) + log_rate * (lower - offset[items]))
+
+    count = len(capacity)
+    low = np.full(count, np.inf)
+    high = np.full(count, -np.inf)
+    np.minimum.at(low, nodes, marginal_upper)
+    np.maximum.at(high, nodes, marginal_lower)
+    low = np.where(np.isfinite(low), low, 0.0)
+    high = np.maximum(np.where(np.isfinite(high), high, 0.0), low)
+
+    def at(log_multiplier: np.ndarray) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = offset[items] + (log_multiplier[nodes] - np.log(slope)) / log_rate
+        return np.clip(np.where(indifferent, lower, x), lower, upper)
+
+    for _ in range(STEPS):
+        middle = (low + high) / 2
+        fits = np.bincount(nodes, at(middle), count) <= capacity
+        high = np.where(fits, middle, high)
+        low = np.where(fits, low, middle)
+    x = at(high)
+
+    # hand the room the bisection left back, it only shortens durations
+    slack = np.maximum(capacity - np.bincount(nodes, x, count), 0)
+    room = np.bincount(nodes, upper - x, count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(room > 0, np.minimum(slack / room, 1), 0)
+    x += (upper - x) * share[nodes]
+
+    # the minimums alone do not fit, scale them like the allocations used to be scaled
+    minimums = np.bincount(nodes, lower, count)
+    infeasible = minimums > capacity
+    if infeasible.any():
+        squeezed = infeasible[nodes]
+        x[squeezed] = lower[squeezed] * (capacity / np.where(infeasible, minimums, 1))[nodes[squeezed]]
+
+    result = allocation.copy()
+    result[items] = x
+    return result
+
+
+def _terms(
+        resource: str,
+        action_classes: list['ActionClass'],
+        class_index: np.ndarray,
+        cpu: np.ndarray,
+        memory: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    offset, rate, scale = np.zeros(len(cpu)), np.ones(len(cpu)), np.zeros(len(cpu))
+    for k in np.unique(class_index):
+        selected = class_index == k
+        offset[selected], rate[selected], scale[selected] = action_classes[k].rescale_terms(
+            resource, cpu[selected], memory[selected]
+        )
+    return offset, rate, scale
+
+
+def rescale_resources(
+        cpu: np.ndarray,
+        memory: np.ndarray,
+        node: np.ndarray,
+        node_cpu: np.ndarray,
+        node_memory: np.ndarray,
+        action_classes: list['ActionClass'],
+        class_index: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    # memory first, then cpu against the new memory, the order the per-node loops used
+    memory = rescale(
+        memory, node, node_memory, MIN_MEMORY_ACTION, *_terms('memory', action_classes, class_index, cpu, memory)
+    )
+    cpu = rescale(
+        cpu, node, node_cpu, MIN_CPU_ACTION, *_terms('cpu', action_classes, class_index, cpu, memory)
+    )
+    return cpu, memory
+
+
+def rescale_nodes(nodes: list['Node']):
+    """Fits the actions of over-committed nodes back into their node in one vectorized step."""
+    nodes = [n for n in nodes if n.free_memory < 0 or n.free_cpu < 0]
+    actions = [a for n in nodes for a in n.actions]
+    if not actions:
+        return
+    action_classes, class_ids, class_index = [], {}, []
+    for a in actions:
+        if id(a.action_class) not in class_ids:
+            class_ids[id(a.action_class)] = len(action_classes)
+            action_classes.append(a.action_class)
+        class_index.append(class_ids[id(a.action_class)])
+    cpu, memory = rescale_resources(
+        cpu=np.array([a.cpu for a in actions], dtype=float),
+        memory=np.array([a.memory for a in actions], dtype=float),
+        node=np.repeat(np.arange(len(nodes)), [len(n.actions) for n in nodes]),
+        node_cpu=np.array([n.cpu for n in nodes], dtype=float),
+        node_memory=np.array([n.memory for n in nodes], dtype=float),
+        action_classes=action_classes,
+        class_index=np.array(class_index, dtype=np.int64)
+    )
+    for action, new_cpu, new_memory in zip(actions, cpu.tolist(), memory.tolist()):
+        if new_cpu != action.cpu or new_memory != action.memory:
+            action.resize(cpu=new_cpu, memory=new_memory)
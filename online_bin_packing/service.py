@@ -0,0 +1,270 @@
+import asyncio
+import functools
+import itertools
+import json
+import math
+import numbers
+import time
+from typing import Callable
+
+import numpy as np
+
+from online_bin_packing.models import Action, Node, Report
+from online_bin_packing.simulation import Simulation
+from online_bin_packing.system import MAX_CPU_ACTION, MAX_MEMORY_ACTION, MIN_CPU_ACTION, MIN_MEMORY_ACTION
+from online_bin_packing.utils import call_solver
+
+
+class Placement:
+    def __init__(self, request_id: int, node_id: int, cpu: float, memory: float, duration: float, latency: float):
+        self.request_id = request_id
+        self.node_id = node_id
+        self.cpu = cpu
+        self.memory = memory
+        self.duration = duration
+        self.latency = latency
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.request_id, 'node': self.node_id, 'cpu': self.cpu, 'memory': self.memory,
+            'duration': self.duration, 'latency': self.latency,
+        }
+
+
+class PlacementService:
+    """Online placement of activation requests, micro-batched per window.
+
+    Requests that arrive within `window` seconds of the first pending one are
+    handed to the solver as one batch, or earlier once `max_batch` are waiting.
+    Solves run one at a time in a worker thread, so requests keep queueing for
+    the next batch meanwhile. The simulation clock follows the event loop clock,
+    and actions end when their completion is reported, not by their duration.
+    """
+
+    def __init__(
+            self,
+            solver: Callable,
+            action_classes: list['ActionClass'],
+            window: float | None = None,
+            max_batch: int | None = None,
+            simulation: Simulation | None = None,
+            **kwargs
+    ):
+        self.solver = solver
+        self.kwargs = kwargs
+        self.classes = {c.name: c for c in action_classes}
+        self.simulation = Simulation() if simulation is None else simulation
+        self.window = self.simulation.time_slot if window is None else window
+        self.max_batch = max_batch
+        self.reports: list[Report] = []
+        self._pending: list[tuple[Action, asyncio.Future, int, float]] = []
+        self._completed: list[int] = []
+        self._actions: dict[int, Action] = {}
+        self._node_ids: dict[Node, int] = {}
+        self._request_ids = itertools.count()
+        self._node_counter = itertools.count()
+        self._lock = asyncio.Lock()
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+        self._epoch: float | None = None
+
+    @property
+    def nodes(self) -> list[Node]:
+        return self.simulation.nodes
+
+    def _now(self) -> float:
+        loop = asyncio.get_running_loop()
+        if self._epoch is None:
+            self._epoch = loop.time() - self.simulation.time
+        return loop.time() - self._epoch
+
+    async def place(self, class_name: str, cpu: float | None = None, memory: float | None = None) -> Placement:
+        if class_name not in self.classes:
+            raise KeyError(f'unknown action class {class_name!r}')
+        # a bad request is refused on its own, it never reaches the batch it would fail for everyone
+        _check_allocation('cpu', cpu, MIN_CPU_ACTION, MAX_CPU_ACTION)
+        _check_allocation('memory', memory, MIN_MEMORY_ACTION, MAX_MEMORY_ACTION)
+        loop = asyncio.get_running_loop()
+        action = self.classes[class_name].generate_activation(cpu=cpu, memory=memory)
+        if not any(action.cpu <= shape.cpu and action.memory <= shape.memory for shape in self.simulation.catalog):
+            raise ValueError(f'an action with cpu {action.cpu} and memory {action.memory} does not fit any node')
+        future = loop.create_future()
+        self._pending.append((action, future, next(self._request_ids), loop.time()))
+        if self.max_batch is not None and len(self._pending) >= self.max_batch:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_now)
+        return await future
+
+    def complete(self, request_id: int) -> bool:
+        # applied before the next solve, so a completion never races a running solver
+        if request_id not in self._actions or request_id in self._completed:
+            return False
+        self._completed.append(request_id)
+        return True
+
+    def _flush_now(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    def _drop_idle_nodes(self):
+        # a released node never comes back, its id goes with it
+        for node in self.nodes:
+            if not node.actions:
+                self._node_ids.pop(node, None)
+        self.simulation.nodes = [n for n in self.nodes if n.actions]
+
+    async def _flush(self, batch: list[tuple[Action, asyncio.Future, int, float]]):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            for request_id in self._completed:
+                action = self._actions.pop(request_id)
+                action.node.stop_action(action)
+            self._completed = []
+            self._drop_idle_nodes()
+            self.simulation.time = self._now()
+
+            activations = [action for action, _, _, _ in batch]
+            try:
+                nodes, solve_info = await loop.run_in_executor(None, functools.partial(
+                    call_solver, self.solver, activations=activations, nodes=self.nodes,
+                    simulation=self.simulation, **self.kwargs
+                ))
+            except Exception as e:
+                # actions the solver had placed before it failed are taken off again, nobody could complete them
+                for action in activations:
+                    if action.node is not None:
+                        action.node.stop_action(action)
+                        action.node = None
+                self._drop_idle_nodes()
+                for _, future, _, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            self.simulation.nodes = nodes
+            self.reports.append(Report(
+                'service', [n for n in nodes if n.actions], solve_info=solve_info, simulation=self.simulation
+            ))
+
+        now = loop.time()
+        for action, future, request_id, arrival in batch:
+            self._actions[request_id] = action
+            if action.node not in self._node_ids:
+                self._node_ids[action.node] = next(self._node_counter)
+            if not future.done():
+                future.set_result(Placement(
+                    request_id, self._node_ids[action.node], action.cpu, action.memory, action.duration,
+                    now - arrival
+                ))
+
+    async def drain(self):
+        # flush what is pending and wait until every started batch is placed
+        self._flush_now()
+        while self._flushes:
+            await asyncio.gather(*self._flushes)
+
+    def stats(self) -> dict:
+        return {
+            'nodes': sum(1 for n in self.nodes if n.actions),
+            'running': len(self._actions) - len(self._completed),
+            'pending': len(self._pending),
+            'batches': len(self.reports),
+            'time': self.simulation.time,
+        }
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 0) -> asyncio.Server:
+        """Serves the service as JSON lines over TCP.
+
+        Requests are `{"op": "place", "class": name, "cpu": ..., "memory": ...}`,
+        `{"op": "complete", "id": request_id}` and `{"op": "stats"}`; each gets one
+        JSON line back, answered as soon as it is done, in any order, tagged with
+        the request's `tag` when one is given.
+        """
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.get_running_loop().create_task(self._answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def _answer(self, line: bytes, writer: asyncio.StreamWriter):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise TypeError(f'a request has to be a JSON object, got {type(request).__name__}')
+            op = request.get('op')
+            if op == 'place':
+                response = (await self.place(request['class'], request.get('cpu'), request.get('memory'))).to_dict()
+            elif op == 'complete':
+                response = {'ok': self.complete(int(request['id']))}
+            elif op == 'stats':
+                response = self.stats()
+            else:
+                response = {'error': f'unknown op {op!r}'}
+            if 'tag' in request:
+                response['tag'] = request['tag']
+        except (ValueError, KeyError, TypeError) as e:
+            response = {'error': str(e.args[0]) if e.args else type(e).__name__}
+        writer.write(json.dumps(response).encode() + b'\n')
+        await writer.drain()
+
+
+def _check_allocation(name: str, value, low: float, high: float):
+    if value is None:
+        return
+    if isinstance(value, bool) or not isinstance(value, numbers.Real) or not math.isfinite(value):
+        raise TypeError(f'{name} has to be a number, got {value!r}')
+    if not low <= value <= high:
+        raise ValueError(f'{name} has to be between {low} and {high}, got {value}')
+
+
+async def load_test(
+        service: PlacementService,
+        count: int,
+        rate: float,
+        seed: int | None = None,
+        hold: float | None = None
+) -> dict:
+    """Sends `count` requests with Poisson arrivals at `rate` per second and reports placement latency.
+
+    Every placed action is reported complete after `hold` seconds, by default its modelled duration.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(service.classes)
+    latencies = []
+
+    async def request(delay: float, name: str):
+        await asyncio.sleep(delay)
+        placement = await service.place(name)
+        latencies.append(placement.latency)
+        await asyncio.sleep(placement.duration if hold is None else hold)
+        service.complete(placement.request_id)
+
+    start = time.perf_counter()
+    delays = np.cumsum(rng.exponential(1 / rate, size=count))
+    await asyncio.gather(*(request(float(d), names[rng.integers(len(names))]) for d in delays))
+    await service.drain()
+    latencies = np.array(latencies)
+    return {
+        'requests': count,
+        'elapsed': time.perf_counter() - start,
+        'batches': len(service.reports),
+        'max_nodes': max((r.node_count for r in service.reports), default=0),
+        'latency_p50': float(np.percentile(latencies, 50)),
+        'latency_p99': float(np.percentile(latencies, 99)),
+        'latency_max': float(latencies.max()),
+    }
@@ -0,0 +1,76 @@
+import random
+
+import numpy as np
+
+from online_bin_packing.catalog import NodeShape
+from online_bin_packing.profiling import Profiler
+from online_bin_packing.system import NODE_CPU, NODE_MEMORY, NODE_PRICE_HOUR, TIME_SLOT, result_dir
+
+
+class Simulation:
+    """Clock, configuration, RNG and node pool of one simulation run.
+
+    Nodes, actions, solvers and reports read the time and node shape from the
+    simulation they are given, so independent runs can share a process. With a
+    `catalog` of several node shapes, its first shape is the default one and
+    replaces `node_memory`, `node_cpu` and `node_price_hour`.
+    """
+
+    def __init__(
+            self,
+            node_memory: float = NODE_MEMORY,
+            node_cpu: float = NODE_CPU,
+            time_slot: float = TIME_SLOT,
+            node_price_hour: float = NODE_PRICE_HOUR,
+            result_dir: str = result_dir,
+            seed: int | None = None,
+            time: float = 0,
+            profiler: Profiler | None = None,
+            catalog: list[NodeShape] | None = None
+    ):
+        if catalog:
+            node_memory, node_cpu, node_price_hour = catalog[0].memory, catalog[0].cpu, catalog[0].price_hour
+        self.node_memory = node_memory
+        self.node_cpu = node_cpu
+        self.time_slot = time_slot
+        self.node_price_hour = node_price_hour
+        self.result_dir = result_dir
+        self.seed = seed
+        self.time = time
+        self.random = random.Random(seed)
+        self.rng = np.random.default_rng(seed)
+        self.nodes: list['Node'] = []
+        self.profiler = Profiler() if profiler is None else profiler
+        self.catalog = list(catalog) if catalog else [NodeShape('default', node_memory, node_cpu, node_price_hour)]
+
+    @property
+    def node_price_time_slot(self) -> float:
+        return self.node_price_hour / (60 * 60 / self.time_slot)
+
+    def advance(self, duration: float | None = None):
+        self.time += self.time_slot if duration is None else duration
+
+    def fork(self, seed: int | None = None) -> 'Simulation':
+        # same configuration, own clock, RNG and node pool
+        return Simulation(
+            self.node_memory, self.node_cpu, self.time_slot, self.node_price_hour, self.result_dir, seed=seed,
+            profiler=Profiler(self.profiler.enabled), catalog=self.catalog
+        )
+
+    def new_node(self, shape: int = 0) -> 'Node':
+        from online_bin_packing.models import Node
+        return Node(self.catalog[shape].memory, self.catalog[shape].cpu, simulation=self, shape=self.catalog[shape])
+
+
+# used by nodes and solvers that are not given a simulation explicitly
+default_simulation = Simulation()
+
+
+def resolve(simulation: Simulation | None, nodes=None) -> Simulation:
+    # an explicit simulation wins, then the one a cluster or the first of a list of nodes was built with,
+    # then the process wide default
+    if simulation is not None:
+        return simulation
+    if isinstance(nodes, list):
+        return nodes[0].simulation if nodes else default_simulation
+    return getattr(nodes, 'simulation', None) or default_simulation
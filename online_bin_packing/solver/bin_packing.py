@@ -1,10 +1,27 @@
-import random
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
+from time import perf_counter
 
+import numpy as np
 from pulp import *
+from scipy.optimize import Bounds, LinearConstraint, milp
+from scipy.sparse import coo_array, vstack
 
-from online_bin_packing.models import Action, Node
-from online_bin_packing.system import NODE_CPU, NODE_MEMORY
+from online_bin_packing.catalog import shape_weights
+from online_bin_packing.cluster import Cluster
+from online_bin_packing.models import Action, Node, SolveInfo
+from online_bin_packing.rescaling import rescale_nodes
+from online_bin_packing.simulation import Simulation, resolve
+from online_bin_packing.solver.vector_packing import PackingPolicy, pack, pack_shaped
+
+# statuses of a single probe with a fixed number of bins
+FEASIBLE = 'feasible'
+INFEASIBLE = 'infeasible'
+TIMEOUT = 'timeout'
+# the solver itself failed, e.g. CBC is missing or crashed
+ERROR = 'error'
 
 
 class BinPackingType(Enum):
@@ -13,77 +30,907 @@ class BinPackingType(Enum):
     BOTH = 'both'
 
 
+class BinPackingBackend(Enum):
+    PULP = 'pulp'
+    SCIPY = 'scipy'
+
+
+class ShardPolicy(Enum):
+    # every shard gets a sample of all cpu/memory ratios, so cpu heavy and memory heavy items can share a node
+    MIX = 'mix'
+    # all activations of a class go to the same shard
+    CLASS = 'class'
+
+
+class _PulpModel:
+    def __init__(
+            self,
+            memory: np.ndarray,
+            cpu: np.ndarray,
+            free_memory: np.ndarray,
+            free_cpu: np.ndarray,
+            bin_type: BinPackingType
+    ):
+        self.num_items = num_items = len(memory)
+        self.num_bins = num_bins = len(free_memory)
+        # Create a new problem instance
+        self.problem = problem = LpProblem("2D_Bin_Packing", LpMinimize)
+
+        # Create binary variables for item placement
+        self.var_names = var_names = [f"x{i}_{j}" for i in range(num_items) for j in range(num_bins)]
+        self.variables = variables = LpVariable.dicts("Variables", var_names, 0, 1, LpBinary)
+
+        # Set objective function
+        objective_cuffs = [1] * (num_items * num_bins)
+        problem += lpSum(
+            [variables[var_name] * objective_coeff for var_name, objective_coeff in zip(var_names, objective_cuffs)])
+
+        # Add constraints to ensure each item is placed in exactly one bin
+        for i in range(num_items):
+            constraint = LpAffineExpression(
+                [(variables[var_name], 1) for var_name in var_names[i * num_bins: (i + 1) * num_bins]])
+            problem += constraint == 1
+
+        # Add constraints to ensure bin capacity is not exceeded
+        for j in range(num_bins):
+            if bin_type != BinPackingType.CPU:
+                constraint_memory = LpAffineExpression(
+                    [(variables[var_names[i * num_bins + j]], memory[i]) for i in range(num_items)])
+                problem += constraint_memory <= free_memory[j]
+
+            if bin_type != BinPackingType.MEMORY:
+                constraint_cpu = LpAffineExpression(
+                    [(variables[var_names[i * num_bins + j]], cpu[i]) for i in range(num_items)])
+                problem += constraint_cpu <= free_cpu[j]
+
+    def solve(self, num_bins: int, time_limit: float, warm_start: np.ndarray | None = None) -> str:
+        # only the first num_bins bins may be used, the rest are fixed to zero
+        for i in range(self.num_items):
+            for j in range(self.num_bins):
+                variable = self.variables[self.var_names[i * self.num_bins + j]]
+                variable.upBound = 1 if j < num_bins else 0
+                if warm_start is not None:
+                    variable.setInitialValue(1 if warm_start[i] == j else 0)
+
+        # Create the solver with the time left in the budget
+        solver = getSolver(
+            'PULP_CBC_CMD', timeLimit=time_limit, msg=False, warmStart=warm_start is not None
+        )
+
+        # Solve the problem, a solver that stopped without a solution has run out of time
+        try:
+            self.problem.solve(solver)
+        except PulpSolverError:
+            return ERROR
+
+        # Check the solution status, any integer solution is as good as another for a fixed bin count
+        if LpStatus[self.problem.status] == 'Infeasible':
+            return INFEASIBLE
+        if self.problem.sol_status not in (LpSolutionOptimal, LpSolutionIntegerFeasible):
+            return TIMEOUT
+        return FEASIBLE
+
+    def extract(self, num_bins: int) -> np.ndarray:
+        # Get the solution
+        assignment = np.full(self.num_items, -1, dtype=np.int64)
+        for i in range(self.num_items):
+            for j in range(num_bins):
+                if self.variables[self.var_names[i * self.num_bins + j]].value() > 0.5:
+                    assignment[i] = j
+        return assignment
+
+
+class _ScipyModel:
+    def __init__(
+            self,
+            memory: np.ndarray,
+            cpu: np.ndarray,
+            free_memory: np.ndarray,
+            free_cpu: np.ndarray,
+            bin_type: BinPackingType
+    ):
+        self.num_items = num_items = len(memory)
+        self.num_bins = num_bins = len(free_memory)
+        # x[i * num_bins + j] == 1 when item i goes to bin j
+        items = np.repeat(np.arange(num_items), num_bins)
+        self.bins = bins = np.tile(np.arange(num_bins), num_items)
+        columns = np.arange(num_items * num_bins)
+
+        # each item is placed in exactly one bin
+        self.constraints = [LinearConstraint(
+            coo_array((np.ones(len(columns)), (items, columns)), shape=(num_items, len(columns))), 1, 1
+        )]
+
+        # bin capacity is not exceeded
+        rows, upper = [], []
+        if bin_type != BinPackingType.CPU:
+            rows.append(coo_array((memory[items], (bins, columns)), shape=(num_bins, len(columns))))
+            upper.append(free_memory)
+        if bin_type != BinPackingType.MEMORY:
+            rows.append(coo_array((cpu[items], (bins, columns)), shape=(num_bins, len(columns))))
+            upper.append(free_cpu)
+        self.constraints.append(LinearConstraint(vstack(rows), -np.inf, np.concatenate(upper)))
+
+    def solve(self, num_bins: int, time_limit: float, warm_start: np.ndarray | None = None) -> str:
+        # HiGHS through milp takes no initial solution, the warm start is only used by the caller's incumbent
+        self.result = result = milp(
+            c=np.ones(len(self.bins)),
+            constraints=self.constraints,
+            integrality=np.ones(len(self.bins)),
+            bounds=Bounds(0, (self.bins < num_bins).astype(float)),
+            options={'time_limit': time_limit}
+        )
+        if result.status == 2:
+            return INFEASIBLE
+        if result.x is None:
+            return TIMEOUT
+        return FEASIBLE
+
+    def extract(self, num_bins: int) -> np.ndarray:
+        return self.result.x.reshape(self.num_items, self.num_bins).argmax(axis=1)
+
+
+class _PricedPulpModel:
+    # bins with a price are opened by y[j], the objective is the price of the opened bins plus a placement
+    # cost per item and bin that only breaks ties
+    def __init__(
+            self,
+            memory: np.ndarray,
+            cpu: np.ndarray,
+            free_memory: np.ndarray,
+            free_cpu: np.ndarray,
+            price: np.ndarray,
+            placement: np.ndarray,
+            bin_type: BinPackingType
+    ):
+        self.num_items = num_items = len(memory)
+        self.num_bins = num_bins = len(free_memory)
+        self.problem = problem = LpProblem("Priced_2D_Bin_Packing", LpMinimize)
+        self.x = [[LpVariable(f"x{i}_{j}", cat=LpBinary) for j in range(num_bins)] for i in range(num_items)]
+        # bins without a price are already paid for, their y is fixed to zero and never limits them
+        self.y = [LpVariable(f"y{j}", 0, 1 if price[j] > 0 else 0, LpBinary) for j in range(num_bins)]
+        self.optimal = False
+
+        # expressions are built from (variable, coefficient) lists, much faster than arithmetic on the variables
+        problem += LpAffineExpression(
+            [(self.y[j], float(price[j])) for j in range(num_bins)]
+            + [(self.x[i][j], float(placement[j])) for i in range(num_items) for j in range(num_bins)]
+        )
+        for i in range(num_items):
+            problem += LpAffineExpression([(x, 1) for x in self.x[i]]) == 1
+        for j in range(num_bins):
+            for demand, free, used in (
+                    (memory, free_memory, bin_type != BinPackingType.CPU),
+                    (cpu, free_cpu, bin_type != BinPackingType.MEMORY),
+            ):
+                if not used:
+                    continue
+                terms = [(self.x[i][j], float(demand[i])) for i in range(num_items)]
+                if price[j] > 0:
+                    problem += LpAffineExpression(terms + [(self.y[j], -float(free[j]))]) <= 0
+                else:
+                    problem += LpAffineExpression(terms) <= float(free[j])
+        for j in _interchangeable(free_memory, free_cpu, price):
+            problem += self.y[j + 1] <= self.y[j]
+
+    def solve(self, time_limit: float, warm_start: np.ndarray | None = None) -> str:
+        if warm_start is not None:
+            for i in range(self.num_items):
+                for j in range(self.num_bins):
+                    self.x[i][j].setInitialValue(1 if warm_start[i] == j else 0)
+            opened = set(warm_start.tolist())
+            for j in range(self.num_bins):
+                if self.y[j].upBound:
+                    self.y[j].setInitialValue(1 if j in opened else 0)
+        solver = getSolver('PULP_CBC_CMD', timeLimit=time_limit, msg=False, warmStart=warm_start is not None)
+        try:
+            self.problem.solve(solver)
+        except PulpSolverError:
+            return ERROR
+        if LpStatus[self.problem.status] == 'Infeasible':
+            return INFEASIBLE
+        if self.problem.sol_status not in (LpSolutionOptimal, LpSolutionIntegerFeasible):
+            return TIMEOUT
+        self.optimal = self.problem.sol_status == LpSolutionOptimal
+        return FEASIBLE
+
+    def extract(self) -> np.ndarray:
+        return np.array([
+            max(range(self.num_bins), key=lambda j: self.x[i][j].value() or 0) for i in range(self.num_items)
+        ], dtype=np.int64)
+
+
+class _PricedScipyModel:
+    def __init__(
+            self,
+            memory: np.ndarray,
+            cpu: np.ndarray,
+            free_memory: np.ndarray,
+            free_cpu: np.ndarray,
+            price: np.ndarray,
+            placement: np.ndarray,
+            bin_type: BinPackingType
+    ):
+        self.num_items = num_items = len(memory)
+        self.num_bins = num_bins = len(free_memory)
+        # x[i * num_bins + j] as in _ScipyModel, followed by y[j] which opens a bin that has a price
+        size = num_items * num_bins + num_bins
+        items = np.repeat(np.arange(num_items), num_bins)
+        bins = np.tile(np.arange(num_bins), num_items)
+        columns = np.arange(num_items * num_bins)
+        priced = price > 0
+        self.c = np.concatenate([np.tile(placement, num_items), price])
+        self.upper = np.concatenate([np.ones(num_items * num_bins), priced.astype(float)])
+        self.optimal = False
+
+        self.constraints = [LinearConstraint(
+            coo_array((np.ones(len(columns)), (items, columns)), shape=(num_items, size)), 1, 1
+        )]
+        # a priced bin's capacity is there only when it is opened, the others always have their free capacity
+        opened = num_items * num_bins + np.arange(num_bins)
+        for demand, free, used in (
+                (memory, free_memory, bin_type != BinPackingType.CPU),
+                (cpu, free_cpu, bin_type != BinPackingType.MEMORY),
+        ):
+            if not used:
+                continue
+            rows = np.concatenate([bins, np.arange(num_bins)])
+            cols = np.concatenate([columns, opened])
+            values = np.concatenate([demand[items], np.where(priced, -free, 0)])
+            self.constraints.append(LinearConstraint(
+                coo_array((values, (rows, cols)), shape=(num_bins, size)), -np.inf, np.where(priced, 0, free)
+            ))
+        pairs = np.array(_interchangeable(free_memory, free_cpu, price), dtype=np.int64)
+        if len(pairs):
+            rows = np.repeat(np.arange(len(pairs)), 2)
+            cols = np.stack([opened[pairs + 1], opened[pairs]], axis=1).ravel()
+            values = np.tile([1.0, -1.0], len(pairs))
+            self.constraints.append(LinearConstraint(
+                coo_array((values, (rows, cols)), shape=(len(pairs), size)), -np.inf, 0
+            ))
+
+    def solve(self, time_limit: float, warm_start: np.ndarray | None = None) -> str:
+        self.result = result = milp(
+            c=self.c,
+            constraints=self.constraints,
+            integrality=np.ones(len(self.c)),
+            bounds=Bounds(0, self.upper),
+            options={'time_limit': time_limit}
+        )
+        if result.status == 2:
+            return INFEASIBLE
+        if result.x is None:
+            return TIMEOUT
+        self.optimal = result.status == 0
+        return FEASIBLE
+
+    def extract(self) -> np.ndarray:
+        return self.result.x[:self.num_items * self.num_bins].reshape(self.num_items, self.num_bins).argmax(axis=1)
+
+
+def _interchangeable(free_memory: np.ndarray, free_cpu: np.ndarray, price: np.ndarray) -> list[int]:
+    # consecutive priced bins of the same shape are opened in order, which cuts the symmetric solutions
+    return [
+        j for j in range(len(price) - 1)
+        if price[j] > 0 and price[j] == price[j + 1]
+        and free_memory[j] == free_memory[j + 1] and free_cpu[j] == free_cpu[j + 1]
+    ]
+
+
+_MODELS = {
+    BinPackingBackend.PULP: _PulpModel,
+    BinPackingBackend.SCIPY: _ScipyModel,
+}
+
+_PRICED_MODELS = {
+    BinPackingBackend.PULP: _PricedPulpModel,
+    BinPackingBackend.SCIPY: _PricedScipyModel,
+}
+
+# seconds per item and bin variable spent outside the solver's own time limit, measured on one core:
+# building the model, and for PuLP writing it out for CBC, CBC's root work and reading the solution back
+_OVERHEAD = {
+    BinPackingBackend.PULP: 2.5e-4,
+    BinPackingBackend.SCIPY: 2e-5,
+}
+
+
+# shortest time limit a solve is started with, CBC can exit without writing a solution under shorter ones
+_MIN_SOLVE_TIME = 0.05
+
+
+def _solve_time(backend: BinPackingBackend, variables: int, deadline: float) -> float:
+    # time limit left for the solver once the overhead of a model this size is paid, below the minimum the ILP
+    # would not finish before the deadline and is better skipped
+    return deadline - perf_counter() - _OVERHEAD[backend] * variables
+
+
+def _lower_bound(
+        memory: np.ndarray,
+        cpu: np.ndarray,
+        free_memory: np.ndarray,
+        free_cpu: np.ndarray,
+        bin_type: BinPackingType
+) -> int:
+    # fewest leading bins whose total free capacity covers the total demand
+    bound = 1
+    if bin_type != BinPackingType.CPU:
+        bound = max(bound, int(np.searchsorted(np.cumsum(free_memory), memory.sum() - 1e-9)) + 1)
+    if bin_type != BinPackingType.MEMORY:
+        bound = max(bound, int(np.searchsorted(np.cumsum(free_cpu), cpu.sum() - 1e-9)) + 1)
+    return bound
+
+
+def _warm_start(
+        assignment: np.ndarray,
+        num_bins: int,
+        memory: np.ndarray,
+        cpu: np.ndarray,
+        free_memory: np.ndarray,
+        free_cpu: np.ndarray,
+        node_memory: float,
+        node_cpu: float
+) -> np.ndarray:
+    # keep the incumbent on the first num_bins bins and first-fit the displaced items into what is left
+    warm_start = assignment.copy()
+    displaced = assignment >= num_bins
+    kept = warm_start[~displaced]
+    residual_memory = free_memory[:num_bins] - np.bincount(kept, memory[~displaced], num_bins)
+    residual_cpu = free_cpu[:num_bins] - np.bincount(kept, cpu[~displaced], num_bins)
+    moved = pack(
+        memory[displaced], cpu[displaced], residual_memory, residual_cpu, PackingPolicy.FIRST_FIT,
+        node_memory=node_memory, node_cpu=node_cpu
+    )
+    # items that needed a new bin go to the roomiest bin, the solver repairs that start
+    moved[moved >= num_bins] = int(np.argmax(residual_memory / node_memory + residual_cpu / node_cpu))
+    warm_start[displaced] = moved
+    return warm_start
+
+
+def _search(
+        memory: np.ndarray,
+        cpu: np.ndarray,
+        free_memory: np.ndarray,
+        free_cpu: np.ndarray,
+        bin_type: BinPackingType,
+        backend: BinPackingBackend,
+        time_budget: float,
+        solve_info: SolveInfo,
+        simulation: Simulation
+) -> tuple[np.ndarray, int]:
+    # bins are used as a prefix of the candidate order, new nodes come after the existing ones
+    deadline = perf_counter() + time_budget
+    if not len(memory):
+        solve_info.status, solve_info.gap = 'optimal', 0.0
+        return np.zeros(0, dtype=np.int64), 0
+    # a dimension the bin type ignores is packed as zero demand
+    memory = memory if bin_type != BinPackingType.CPU else np.zeros(len(memory))
+    cpu = cpu if bin_type != BinPackingType.MEMORY else np.zeros(len(cpu))
+    assignment = pack(
+        memory, cpu, free_memory, free_cpu, PackingPolicy.FIRST_FIT, decreasing=True,
+        node_memory=simulation.node_memory, node_cpu=simulation.node_cpu
+    )
+    upper = int(assignment.max()) + 1
+    new_nodes = max(upper - len(free_memory), 0)
+    free_memory = np.append(free_memory[:upper], [simulation.node_memory] * new_nodes)
+    free_cpu = np.append(free_cpu[:upper], [simulation.node_cpu] * new_nodes)
+    lower = min(_lower_bound(memory, cpu, free_memory, free_cpu, bin_type), upper)
+
+    # the greedy packing is the incumbent with upper bins, look for the fewest bins the ILP can do with
+    # until the budget runs out
+    profiler = simulation.profiler
+    model = None
+    while lower < upper:
+        # the deadline covers building and handing over the model too, a model that does not fit is never built
+        time_limit = _solve_time(backend, len(memory) * upper, deadline)
+        if time_limit < _MIN_SOLVE_TIME:
+            profiler.count('model skips')
+            break
+        if model is None:
+            with profiler.phase('model build'):
+                model = _MODELS[backend](memory, cpu, free_memory, free_cpu, bin_type)
+            time_limit = min(time_limit, deadline - perf_counter())
+        middle = (lower + upper) // 2
+        warm_start = _warm_start(
+            assignment, middle, memory, cpu, free_memory, free_cpu, simulation.node_memory, simulation.node_cpu
+        )
+        with profiler.phase('model solve'):
+            status = model.solve(middle, time_limit, warm_start)
+        solve_info.solves += 1
+        profiler.count('model solves')
+        if status == FEASIBLE:
+            with profiler.phase('extraction'):
+                assignment, upper = model.extract(middle), middle
+        elif status == INFEASIBLE:
+            lower = middle + 1
+        else:
+            break
+    solve_info.status = 'optimal' if lower >= upper else 'feasible'
+    if model is not None and status == ERROR:
+        # the greedy incumbent is kept, the report shows the solver failed rather than ran out of time
+        solve_info.status = ERROR
+        profiler.count('model errors')
+    solve_info.gap = (upper - lower) / upper
+    return assignment, upper
+
+
+def _price_search(
+        memory: np.ndarray,
+        cpu: np.ndarray,
+        free_memory: np.ndarray,
+        free_cpu: np.ndarray,
+        bin_type: BinPackingType,
+        backend: BinPackingBackend,
+        time_budget: float,
+        solve_info: SolveInfo,
+        simulation: Simulation,
+        used_memory: float = 0,
+        used_cpu: float = 0,
+        idle_shape: np.ndarray | None = None
+) -> tuple[np.ndarray, list[int]]:
+    """Places the items on the candidates and new nodes of the catalog's shapes at the lowest price.
+
+    Returns the assignment, where bins past the candidates are new nodes, and the
+    catalog index of every new node. The shaped greedy packing is the incumbent,
+    the ILP picks how many nodes of each shape to open within the time budget.
+    A shape's price is weighted by how much dearer it is than the best shape for
+    the memory/cpu mix of the running and new actions, `used_memory` and
+    `used_cpu` plus the items, so one skewed slot does not open nodes that the
+    following slots leave half empty. Candidates with a catalog index in
+    `idle_shape` run nothing yet and are paid for once used, like new nodes.
+    """
+    deadline = perf_counter() + time_budget
+    if not len(memory):
+        solve_info.status, solve_info.gap = 'optimal', 0.0
+        return np.zeros(0, dtype=np.int64), []
+    catalog = simulation.catalog
+    memory = memory if bin_type != BinPackingType.CPU else np.zeros(len(memory))
+    cpu = cpu if bin_type != BinPackingType.MEMORY else np.zeros(len(cpu))
+    assignment, shapes = pack_shaped(memory, cpu, free_memory, free_cpu, catalog, used_memory, used_cpu)
+    weights = shape_weights(catalog, used_memory + memory.sum(), used_cpu + cpu.sum())
+
+    # every shape gets as many new bins as the greedy opened of it or the whole demand would need of it alone
+    counts = [
+        min(max(shapes.count(k), math.ceil(max(memory.sum() / shape.memory, cpu.sum() / shape.cpu))), len(memory))
+        for k, shape in enumerate(catalog)
+    ]
+    pool = np.repeat(np.arange(len(catalog)), counts)
+    offset = np.concatenate([[0], np.cumsum(counts)])
+    bins_memory = np.concatenate([free_memory, [catalog[k].memory for k in pool]])
+    bins_cpu = np.concatenate([free_cpu, [catalog[k].cpu for k in pool]])
+    idle_shape = np.full(len(free_memory), -1) if idle_shape is None else idle_shape
+    price = np.array([
+        catalog[k].price_time_slot(simulation.time_slot) * weights[k] if k >= 0 else 0.0
+        for k in np.concatenate([idle_shape, pool]).tolist()
+    ])
+    # among bins that cost the same, earlier candidates are filled first as in the bin counting search;
+    # all items together pay less than half the cheapest node, large enough for the solvers' gap tolerance
+    cheapest = min(shape.price_time_slot(simulation.time_slot) for shape in catalog)
+    placement = 0.5 * cheapest * np.arange(len(price)) / (len(price) * len(memory))
+
+    # the greedy's t-th new node of a shape is that shape's t-th bin in the pool
+    warm_start = assignment.copy()
+    seen = np.zeros(len(catalog), dtype=np.int64)
+    for g, shape in enumerate(shapes):
+        warm_start[assignment == len(free_memory) + g] = len(free_memory) + offset[shape] + seen[shape]
+        seen[shape] += 1
+
+    profiler = simulation.profiler
+    solve_info.status, solve_info.gap = 'feasible', None
+    time_limit = _solve_time(backend, (len(memory) + 1) * len(price), deadline)
+    if time_limit < _MIN_SOLVE_TIME:
+        profiler.count('model skips')
+    else:
+        with profiler.phase('model build'):
+            model = _PRICED_MODELS[backend](memory, cpu, bins_memory, bins_cpu, price, placement, bin_type)
+        with profiler.phase('model solve'):
+            status = model.solve(min(time_limit, deadline - perf_counter()), warm_start)
+        solve_info.solves += 1
+        profiler.count('model solves')
+        if status == FEASIBLE:
+            with profiler.phase('extraction'):
+                solution = model.extract()
+            if price[np.unique(solution)].sum() <= price[np.unique(warm_start)].sum() + 1e-12:
+                warm_start = solution
+                if model.optimal:
+                    solve_info.status, solve_info.gap = 'optimal', 0.0
+        elif status == ERROR:
+            solve_info.status = ERROR
+            profiler.count('model errors')
+
+    # the pool bins in use become the new nodes, in pool order
+    used = np.unique(warm_start[warm_start >= len(free_memory)])
+    renumber = np.arange(len(bins_memory))
+    renumber[used] = len(free_memory) + np.arange(len(used))
+    return renumber[warm_start], pool[used - len(free_memory)].tolist()
+
+
+def _idle_shape(nodes: list[Node], simulation: Simulation) -> np.ndarray:
+    # catalog index of every node that runs nothing yet, -1 for the busy ones
+    return np.array([
+        -1 if n.actions else next((k for k, s in enumerate(simulation.catalog) if s is n.shape), 0) for n in nodes
+    ], dtype=np.int64)
+
+
 def bin_packing(
         activations: list[Action],
-        nodes: list[Node],
-        active_nodes: list[Node],
-        bin_type: BinPackingType = BinPackingType.BOTH
-) -> list[Node]:
+        nodes: list[Node] | Cluster,
+        active_nodes: list[Node] | None = None,
+        bin_type: BinPackingType = BinPackingType.BOTH,
+        backend: BinPackingBackend = BinPackingBackend.PULP,
+        time_budget: float | None = None,
+        solve_info: SolveInfo | None = None,
+        simulation: Simulation | None = None
+) -> list[Node] | Cluster:
+    # the solver gets one slot of the simulation unless told otherwise
+    simulation = resolve(simulation, nodes)
+    time_budget = simulation.time_slot if time_budget is None else time_budget
+    solve_info = SolveInfo() if solve_info is None else solve_info
+    if isinstance(nodes, Cluster):
+        return _bin_packing_cluster(activations, nodes, bin_type, backend, time_budget, solve_info, simulation)
     w_activations = activations.copy()
-    random.shuffle(w_activations)
-    num_items = len(w_activations)
-    num_bins = len(active_nodes)
-    # Create a new problem instance
-    problem = LpProblem("2D_Bin_Packing", LpMinimize)
-
-    # Create binary variables for item placement
-    var_names = [f"x{i}_{j}" for i in range(num_items) for j in range(num_bins)]
-    variables = LpVariable.dicts("Variables", var_names, 0, 1, LpBinary)
-
-    # Set objective function
-    objective_cuffs = [1] * (num_items * num_bins)
-    problem += lpSum(
-        [variables[var_name] * objective_coeff for var_name, objective_coeff in zip(var_names, objective_cuffs)])
-
-    # Add constraints to ensure each item is placed in exactly one bin
-    for i in range(num_items):
-        constraint = LpAffineExpression(
-            [(variables[var_name], 1) for var_name in var_names[i * num_bins: (i + 1) * num_bins]])
-        problem += constraint == 1
-
-    # Add constraints to ensure bin capacity is not exceeded
-    for j in range(num_bins):
-        if bin_type != BinPackingType.CPU:
-            constraint_memory = LpAffineExpression(
-                [(variables[var_names[i * num_bins + j]], w_activations[i].memory) for i in range(num_items)])
-            problem += constraint_memory <= active_nodes[j].free_memory
+    simulation.random.shuffle(w_activations)
 
-        if bin_type != BinPackingType.MEMORY:
-            constraint_cpu = LpAffineExpression(
-                [(variables[var_names[i * num_bins + j]], w_activations[i].cpu) for i in range(num_items)])
-            problem += constraint_cpu <= active_nodes[j].free_cpu
+    # reuse the nodes that stay busy the longest first; the end times are cached per node, so this is one sort
+    # per slot, cheaper than keeping an ordered index up to date through every start, stop and migration
+    candidates = (active_nodes or []) + sorted(nodes, key=lambda n: n.end_time, reverse=True)
+    problem = dict(
+        memory=np.array([a.memory for a in w_activations], dtype=float),
+        cpu=np.array([a.cpu for a in w_activations], dtype=float),
+        free_memory=np.array([n.free_memory for n in candidates], dtype=float),
+        free_cpu=np.array([n.free_cpu for n in candidates], dtype=float),
+        bin_type=bin_type,
+        backend=backend,
+        time_budget=time_budget,
+        solve_info=solve_info,
+        simulation=simulation
+    )
+    # with several node shapes the ILP minimizes the price of the new nodes instead of counting bins
+    if len(simulation.catalog) > 1:
+        assignment, shapes = _price_search(
+            **problem,
+            used_memory=sum(n.usage_memory for n in candidates),
+            used_cpu=sum(n.usage_cpu for n in candidates),
+            idle_shape=_idle_shape(candidates, simulation)
+        )
+        num_bins = len(candidates) + len(shapes)
+    else:
+        assignment, num_bins = _search(**problem)
+        shapes = [0] * (num_bins - len(candidates))
+    candidates += [simulation.new_node(shape) for shape in shapes]
+
+    for activation, j in zip(w_activations, assignment):
+        activation.add_to_node(candidates[j])
+    rescale_nodes(candidates[:num_bins])
+    return candidates
+
+
+def _bin_packing_cluster(
+        activations: list[Action],
+        cluster: Cluster,
+        bin_type: BinPackingType = BinPackingType.BOTH,
+        backend: BinPackingBackend = BinPackingBackend.PULP,
+        time_budget: float | None = None,
+        solve_info: SolveInfo | None = None,
+        simulation: Simulation | None = None
+) -> Cluster:
+    simulation = resolve(simulation, cluster)
+    time_budget = simulation.time_slot if time_budget is None else time_budget
+    solve_info = SolveInfo() if solve_info is None else solve_info
+    actions = simulation.rng.permutation(cluster.add_activations(activations))
+    # longest busy first, one argsort of the kept end times per slot instead of an index maintained on every change
+    candidates = np.argsort(-cluster.time_to_end(), kind='stable')
+    problem = dict(
+        memory=cluster.action_memory[actions],
+        cpu=cluster.action_cpu[actions],
+        free_memory=cluster.free_memory[candidates],
+        free_cpu=cluster.free_cpu[candidates],
+        bin_type=bin_type,
+        backend=backend,
+        time_budget=time_budget,
+        solve_info=solve_info,
+        simulation=simulation
+    )
+    if len(simulation.catalog) > 1:
+        count = cluster.node_count
+        assignment, shapes = _price_search(
+            **problem, used_memory=cluster.usage_memory[:count].sum(), used_cpu=cluster.usage_cpu[:count].sum(),
+            idle_shape=np.where(cluster.node_actions[candidates] > 0, -1, cluster.node_shape[candidates])
+        )
+        num_bins = len(candidates) + len(shapes)
+        candidates = np.concatenate([
+            candidates, np.array([cluster.add_node(shape=shape) for shape in shapes], dtype=np.int64)
+        ])
+    else:
+        assignment, num_bins = _search(**problem)
+        if num_bins > len(candidates):
+            candidates = np.concatenate([candidates, cluster.add_nodes(
+                num_bins - len(candidates), simulation.node_memory, simulation.node_cpu
+            )])
+
+    cluster.place(actions, candidates[assignment])
+    cluster.re_config(candidates[:num_bins])
+    return cluster
+
+
+# one pool for all sharded solves of a process, created on first use
+_shard_pool: tuple[int, ProcessPoolExecutor] | None = None
 
-    # Create the solver with a timeout of 60 seconds
-    solver = getSolver('PULP_CBC_CMD', timeLimit=60, msg=False)
 
-    # Solve the problem
-    problem.solve(solver)
+def _executor(processes: int) -> ProcessPoolExecutor:
+    global _shard_pool
+    if _shard_pool is None or _shard_pool[0] != processes:
+        if _shard_pool is not None:
+            _shard_pool[1].shutdown()
+        _shard_pool = (processes, ProcessPoolExecutor(max_workers=processes))
+    return _shard_pool[1]
 
-    # Check the solution status
-    if LpStatus[problem.status] != 'Optimal':
-        if nodes:
-            nodes = sorted(nodes, key=lambda n: n.time_to_end, reverse=True)
-            active_nodes.append(nodes.pop(0))
+
+def _search_shard(
+        memory: np.ndarray,
+        cpu: np.ndarray,
+        free_memory: np.ndarray,
+        free_cpu: np.ndarray,
+        bin_type: BinPackingType,
+        backend: BinPackingBackend,
+        time_budget: float,
+        simulation: Simulation,
+        used_memory: float,
+        used_cpu: float,
+        idle_shape: np.ndarray
+) -> tuple[np.ndarray, list[int], SolveInfo]:
+    # the assignment, where bins past the candidates are new nodes, and the catalog index of every new node
+    solve_info = SolveInfo()
+    if len(simulation.catalog) > 1:
+        assignment, shapes = _price_search(
+            memory, cpu, free_memory, free_cpu, bin_type, backend, time_budget, solve_info, simulation,
+            used_memory, used_cpu, idle_shape
+        )
+    else:
+        assignment, num_bins = _search(
+            memory, cpu, free_memory, free_cpu, bin_type, backend, time_budget, solve_info, simulation
+        )
+        shapes = [0] * max(num_bins - len(free_memory), 0)
+    return assignment, shapes, solve_info
+
+
+def _shards(
+        memory: np.ndarray,
+        cpu: np.ndarray,
+        class_ids: np.ndarray,
+        count: int,
+        policy: ShardPolicy,
+        simulation: Simulation
+) -> list[np.ndarray]:
+    if policy == ShardPolicy.CLASS:
+        # largest classes first, each onto the shard with the fewest items so far
+        classes, sizes = np.unique(class_ids, return_counts=True)
+        shards = [[] for _ in range(count)]
+        for class_id in classes[np.argsort(-sizes, kind='stable')]:
+            min(shards, key=lambda shard: sum(map(len, shard))).append(np.flatnonzero(class_ids == class_id))
+        return [np.concatenate(shard) if shard else np.zeros(0, dtype=np.int64) for shard in shards]
+    ratio = memory / simulation.node_memory - cpu / simulation.node_cpu
+    order = np.argsort(ratio, kind='stable')
+    return [order[k::count] for k in range(count)]
+
+
+def _drain_new_bins(
+        assignment: np.ndarray,
+        memory: np.ndarray,
+        cpu: np.ndarray,
+        free_memory: np.ndarray,
+        free_cpu: np.ndarray,
+        existing: int,
+        deadline: float,
+        simulation: Simulation
+) -> tuple[np.ndarray, np.ndarray]:
+    # try to empty the emptiest new bins into the room left on the others, a bin is only drained as a whole
+    residual_memory = free_memory - np.bincount(assignment, memory, len(free_memory))
+    residual_cpu = free_cpu - np.bincount(assignment, cpu, len(free_cpu))
+    fill = (free_memory - residual_memory) / simulation.node_memory + (free_cpu - residual_cpu) / simulation.node_cpu
+    closed = np.zeros(len(free_memory), dtype=bool)
+    for b in existing + np.argsort(fill[existing:], kind='stable'):
+        if perf_counter() > deadline:
+            break
+        items = np.flatnonzero(assignment == b)
+        closed[b] = True
+        room_memory = np.where(closed, -np.inf, residual_memory)
+        room_cpu = np.where(closed, -np.inf, residual_cpu)
+        moved = pack(
+            memory[items], cpu[items], room_memory, room_cpu, PackingPolicy.FIRST_FIT, decreasing=True,
+            node_memory=simulation.node_memory, node_cpu=simulation.node_cpu
+        )
+        if len(moved) and moved.max() >= len(free_memory):
+            closed[b] = False
+            continue
+        assignment[items] = moved
+        np.subtract.at(residual_memory, moved, memory[items])
+        np.subtract.at(residual_cpu, moved, cpu[items])
+
+    # new bins that are still used are renumbered right after the existing ones, returned with their old numbers
+    used = np.unique(assignment[assignment >= existing])
+    renumber = np.arange(len(free_memory))
+    renumber[used] = existing + np.arange(len(used))
+    return renumber[assignment], used
+
+
+def _price(assignment: np.ndarray, idle_shape: np.ndarray, shapes: list[int], simulation: Simulation) -> float:
+    # what the bins an assignment uses cost for a slot, busy candidates are paid for already
+    price = np.array([shape.price_time_slot(simulation.time_slot) for shape in simulation.catalog])
+    bins = np.concatenate([idle_shape, np.asarray(shapes, dtype=np.int64)])
+    return float(np.where(bins >= 0, price[bins], 0.0)[np.unique(assignment)].sum())
+
+
+def _shard_count(
+        items: int,
+        bins: int,
+        shard_size: int,
+        processes: int,
+        backend: BinPackingBackend,
+        time_budget: float
+) -> int | None:
+    # fewest shards of at most shard_size items whose ILPs fit their share of the budget, each shard gets about
+    # 1 / count of the items and of the bins, and the workers solve the shards in rounds of `processes`;
+    # None when no split lets a shard ILP run
+    for count in range(max(1, -(-items // shard_size)), max(items // 8, 1) + 1):
+        shard_budget = time_budget / -(-count // processes)
+        variables = -(-items // count) * -(-bins // count)
+        if _OVERHEAD[backend] * variables + _MIN_SOLVE_TIME <= shard_budget:
+            return count
+        if shard_budget < _MIN_SOLVE_TIME:
+            return None
+    return None
+
+
+def _sharded_search(
+        memory: np.ndarray,
+        cpu: np.ndarray,
+        free_memory: np.ndarray,
+        free_cpu: np.ndarray,
+        class_ids: np.ndarray,
+        used_memory: float,
+        used_cpu: float,
+        idle_shape: np.ndarray,
+        bin_type: BinPackingType,
+        backend: BinPackingBackend,
+        time_budget: float,
+        shard_size: int,
+        processes: int,
+        policy: ShardPolicy,
+        solve_info: SolveInfo,
+        simulation: Simulation
+) -> tuple[np.ndarray, list[int]]:
+    # the deadline covers the greedy incumbent, the shard ILPs and the repair pass
+    deadline = perf_counter() + time_budget
+    catalog = simulation.catalog
+    memory = memory if bin_type != BinPackingType.CPU else np.zeros(len(memory))
+    cpu = cpu if bin_type != BinPackingType.MEMORY else np.zeros(len(cpu))
+    # one greedy pass over all of the room is the incumbent, the shards only see part of the existing nodes
+    # and can lose to it
+    greedy, greedy_shapes = pack_shaped(memory, cpu, free_memory, free_cpu, catalog, used_memory, used_cpu)
+    assignment, shapes = greedy, greedy_shapes
+    failed = False
+
+    # most of what is left goes to the shard ILPs, the rest to the repair pass
+    count = _shard_count(
+        len(memory), int(greedy.max(initial=-1)) + 1, shard_size, processes, backend,
+        0.8 * (deadline - perf_counter())
+    ) if len(memory) else None
+    if count is None:
+        simulation.profiler.count('model skips')
+    else:
+        # every shard solves its items against a round-robin share of the candidate nodes, in candidate order
+        item_shards = _shards(memory, cpu, class_ids, count, policy, simulation)
+        node_shards = [np.arange(len(free_memory))[k::count] for k in range(count)]
+        shard_budget = 0.8 * (deadline - perf_counter()) / -(-count // processes)
+        arguments = [
+            (memory[items], cpu[items], free_memory[bins], free_cpu[bins], bin_type, backend, shard_budget,
+             simulation.fork(), used_memory, used_cpu, idle_shape[bins])
+            for items, bins in zip(item_shards, node_shards)
+        ]
+        if count == 1 or processes == 1:
+            results = [_search_shard(*shard) for shard in arguments]
         else:
-            active_nodes.append(Node(NODE_MEMORY, NODE_CPU))
-        return bin_packing(activations=activations, nodes=nodes, active_nodes=active_nodes, bin_type=bin_type)
-
-    # Get the solution
-    result_nodes: dict[int:Node] = {}
-    for j in range(num_bins):
-        node: Node = active_nodes[j]
-        sum_usage = {
-            BinPackingType.CPU: 0,
-            BinPackingType.MEMORY: 0,
-        }
-        for i in range(num_items):
-            if variables[var_names[i * num_bins + j]].value() > 0.5:
-                w_activations[i].add_to_node(node)
-                sum_usage[BinPackingType.CPU] += w_activations[i].cpu
-                sum_usage[BinPackingType.MEMORY] += w_activations[i].memory
-                result_nodes[j] = node
-        while node.free_memory < 0:
-            node.re_config_memory()
-        while node.free_cpu < 0:
-            node.re_config_cpu()
-    return active_nodes + nodes
+            results = list(_executor(processes).map(_search_shard, *zip(*arguments)))
+
+        # the new nodes of every shard stay separate new nodes until the repair pass merges them
+        sharded = np.full(len(memory), -1, dtype=np.int64)
+        sharded_shapes = []
+        for items, bins, (local, local_shapes, shard_info) in zip(item_shards, node_shards, results):
+            existing = local < len(bins)
+            sharded[items[existing]] = bins[local[existing]]
+            sharded[items[~existing]] = len(free_memory) + len(sharded_shapes) + local[~existing] - len(bins)
+            sharded_shapes += local_shapes
+            solve_info.solves += shard_info.solves
+            failed = failed or shard_info.status == ERROR
+
+        sharded, kept = _drain_new_bins(
+            sharded, memory, cpu,
+            np.append(free_memory, [catalog[k].memory for k in sharded_shapes]),
+            np.append(free_cpu, [catalog[k].cpu for k in sharded_shapes]),
+            len(free_memory), deadline, simulation
+        )
+        sharded_shapes = [sharded_shapes[b - len(free_memory)] for b in kept]
+        greedy_price = _price(greedy, idle_shape, greedy_shapes, simulation)
+        if _price(sharded, idle_shape, sharded_shapes, simulation) < greedy_price:
+            assignment, shapes = sharded, sharded_shapes
+
+    num_bins = int(assignment.max(initial=-1)) + 1
+    all_free_memory = np.append(free_memory, [catalog[k].memory for k in shapes])[:num_bins]
+    all_free_cpu = np.append(free_cpu, [catalog[k].cpu for k in shapes])[:num_bins]
+    used = len(np.unique(assignment))
+    lower = _lower_bound(memory, cpu, all_free_memory, all_free_cpu, bin_type) if len(memory) else 0
+    solve_info.status = ERROR if failed else 'optimal' if used <= lower else 'feasible'
+    solve_info.gap = max(used - lower, 0) / used if used else 0.0
+    return assignment, shapes
+
+
+def sharded_bin_packing(
+        activations: list[Action],
+        nodes: list[Node] | Cluster,
+        bin_type: BinPackingType = BinPackingType.BOTH,
+        backend: BinPackingBackend = BinPackingBackend.PULP,
+        time_budget: float | None = None,
+        shard_size: int = 200,
+        processes: int | None = None,
+        policy: ShardPolicy = ShardPolicy.MIX,
+        solve_info: SolveInfo | None = None,
+        simulation: Simulation | None = None
+) -> list[Node] | Cluster:
+    """Bin packing for large slots, split into shards of at most `shard_size` activations.
+
+    The shards are solved by `processes` worker processes, each against its own
+    round-robin share of the candidate nodes. The new nodes the shards opened are
+    then drained, emptiest first, into the room left anywhere else, and the result
+    is kept only when the nodes it opens or wakes cost less than those of first
+    fit decreasing over all of the room. New nodes take the catalog shape
+    `choose_shape` picks, and with several shapes every shard runs the price
+    search of `bin_packing`.
+
+    Everything, the greedy and the repair included, runs within `time_budget`.
+    Shards are made smaller until each shard's ILP fits its share of the budget,
+    and the slot is left to first fit decreasing when none does. ILP time grows
+    with items times bins, so larger slots need a larger budget or more
+    `processes` to reach the shard ILPs.
+    """
+    simulation = resolve(simulation, nodes)
+    time_budget = simulation.time_slot if time_budget is None else time_budget
+    solve_info = SolveInfo() if solve_info is None else solve_info
+    processes = processes or os.cpu_count() or 1
+
+    if isinstance(nodes, Cluster):
+        cluster = nodes
+        actions = cluster.add_activations(activations)
+        candidates = np.argsort(-cluster.time_to_end(), kind='stable')
+        count = cluster.node_count
+        assignment, shapes = _sharded_search(
+            cluster.action_memory[actions], cluster.action_cpu[actions],
+            cluster.free_memory[candidates], cluster.free_cpu[candidates], cluster.action_class[actions],
+            cluster.usage_memory[:count].sum(), cluster.usage_cpu[:count].sum(),
+            np.where(cluster.node_actions[candidates] > 0, -1, cluster.node_shape[candidates]),
+            bin_type, backend, time_budget, shard_size, processes, policy, solve_info, simulation
+        )
+        candidates = np.concatenate([
+            candidates, np.array([cluster.add_node(shape=shape) for shape in shapes], dtype=np.int64)
+        ])
+        cluster.place(actions, candidates[assignment])
+        cluster.re_config(np.unique(candidates[assignment]))
+        return cluster
+
+    candidates = sorted(nodes, key=lambda n: n.end_time, reverse=True)
+    class_names = {}
+    assignment, shapes = _sharded_search(
+        np.array([a.memory for a in activations], dtype=float),
+        np.array([a.cpu for a in activations], dtype=float),
+        np.array([n.free_memory for n in candidates], dtype=float),
+        np.array([n.free_cpu for n in candidates], dtype=float),
+        np.array([class_names.setdefault(a.action_class.name, len(class_names)) for a in activations], dtype=np.int64),
+        sum(n.usage_memory for n in candidates), sum(n.usage_cpu for n in candidates),
+        _idle_shape(candidates, simulation),
+        bin_type, backend, time_budget, shard_size, processes, policy, solve_info, simulation
+    )
+    candidates += [simulation.new_node(shape) for shape in shapes]
+    for activation, j in zip(activations, assignment):
+        activation.add_to_node(candidates[j])
+    rescale_nodes([candidates[j] for j in np.unique(assignment)])
+    return candidates
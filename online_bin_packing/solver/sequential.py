@@ -1,18 +1,36 @@
-import random
+import numpy as np
 
+from online_bin_packing.catalog import choose_shape, pending_demand
+from online_bin_packing.cluster import Cluster
 from online_bin_packing.models import Action, Node
-from online_bin_packing.system import NODE_CPU, NODE_MEMORY
+from online_bin_packing.simulation import Simulation, resolve
+from online_bin_packing.workload import ActivationBatch
 
 
-def sequential(activations: list[Action], nodes: list[Node]) -> list[Node]:
-    random.shuffle(nodes)
+def sequential(
+        activations: list[Action],
+        nodes: list[Node] | Cluster,
+        simulation: Simulation | None = None
+) -> list[Node] | Cluster:
+    simulation = resolve(simulation, nodes)
+    if isinstance(nodes, Cluster):
+        return _sequential_cluster(activations, nodes, simulation)
+    simulation.random.shuffle(nodes)
+    pending_memory, pending_cpu = pending_demand(
+        simulation.catalog, [a.memory for a in activations], [a.cpu for a in activations],
+        sum(n.usage_memory for n in nodes), sum(n.usage_cpu for n in nodes)
+    )
     node_count = 0
     action_count = 0
     while True:
         if action_count == len(activations):
             return nodes
         if node_count == len(nodes):
-            nodes.append(Node(NODE_MEMORY, NODE_CPU))
+            activation = activations[action_count]
+            nodes.append(simulation.new_node(choose_shape(
+                simulation.catalog, pending_memory[action_count], pending_cpu[action_count],
+                activation.memory, activation.cpu
+            )))
             continue
         node = nodes[node_count]
         activation = activations[action_count]
@@ -23,7 +41,50 @@ def sequential(activations: list[Action], nodes: list[Node]) -> list[Node]:
         action_count += 1
 
 
-def shuffle_sequential(activations: list[Action], nodes: list[Node]) -> list[Node]:
+def _sequential_cluster(activations: list[Action], cluster: Cluster, simulation: Simulation) -> Cluster:
+    order = simulation.rng.permutation(cluster.node_count)
+    actions = cluster.add_activations(activations)
+    count = cluster.node_count
+    pending_memory, pending_cpu = pending_demand(
+        simulation.catalog, cluster.action_memory[actions], cluster.action_cpu[actions],
+        cluster.usage_memory[:count].sum(), cluster.usage_cpu[:count].sum()
+    )
+    # free room in visiting order, read once and kept up to date here; room for one new node per action
+    order = np.append(order, np.zeros(len(actions), dtype=np.int64))
+    free_cpu = np.append(cluster.free_cpu[order[:count]], np.zeros(len(actions)))
+    free_memory = np.append(cluster.free_memory[order[:count]], np.zeros(len(actions)))
+    action_cpu, action_memory = cluster.action_cpu[actions].tolist(), cluster.action_memory[actions].tolist()
+    nodes = np.empty(len(actions), dtype=np.int64)
+    start = 0
+    for k, (cpu, memory) in enumerate(zip(action_cpu, action_memory)):
+        # the current node is checked on its own, the rest of the order is only scanned once it is full
+        if start == count or free_cpu[start] < cpu or free_memory[start] < memory:
+            fits = (free_cpu[start:count] >= cpu) & (free_memory[start:count] >= memory)
+            if fits.any():
+                start += int(np.argmax(fits))
+            else:
+                shape = choose_shape(simulation.catalog, pending_memory[k], pending_cpu[k], memory, cpu)
+                order[count] = cluster.add_node(shape=shape)
+                free_cpu[count], free_memory[count] = simulation.catalog[shape].cpu, simulation.catalog[shape].memory
+                start = count
+                count += 1
+        free_cpu[start] -= cpu
+        free_memory[start] -= memory
+        nodes[k] = order[start]
+    cluster.place(actions, nodes)
+    return cluster
+
+
+def shuffle_sequential(
+        activations: list[Action] | ActivationBatch,
+        nodes: list[Node] | Cluster,
+        simulation: Simulation | None = None
+) -> list[Node] | Cluster:
+    simulation = resolve(simulation, nodes)
+    if isinstance(activations, ActivationBatch):
+        # a batch is shuffled through an index permutation of its arrays, list nodes take it as actions
+        shuffled = activations[simulation.rng.permutation(len(activations))]
+        return sequential(shuffled if isinstance(nodes, Cluster) else shuffled.to_actions(), nodes, simulation)
     w_activations = activations.copy()
-    random.shuffle(w_activations)
-    return sequential(w_activations, nodes)
+    simulation.random.shuffle(w_activations)
+    return sequential(w_activations, nodes, simulation)
@@ -0,0 +1,263 @@
+from enum import Enum
+
+import numpy as np
+
+from online_bin_packing.catalog import NodeShape, choose_shape, pending_demand
+from online_bin_packing.cluster import Cluster
+from online_bin_packing.models import Action, Node
+from online_bin_packing.simulation import Simulation, resolve
+from online_bin_packing.system import NODE_CPU, NODE_MEMORY, TIME_SLOT
+
+
+class PackingPolicy(Enum):
+    FIRST_FIT = 'first fit'
+    BEST_FIT = 'best fit'
+    DOT_PRODUCT = 'dot product'
+    L2_NORM = 'l2 norm'
+    COMPLETION_TIME = 'completion time'
+
+
+def _first_fit(memory: float, cpu: float, free_memory: np.ndarray, free_cpu: np.ndarray) -> int:
+    if not len(free_memory):
+        return -1
+    fits = (free_memory >= memory) & (free_cpu >= cpu)
+    j = int(np.argmax(fits))
+    return j if fits[j] else -1
+
+
+def _best_fit(memory: float, cpu: float, free_memory: np.ndarray, free_cpu: np.ndarray) -> int:
+    # the tightest memory fit that also has enough cpu
+    fits = (free_memory >= memory) & (free_cpu >= cpu)
+    if not fits.any():
+        return -1
+    return int(np.argmin(np.where(fits, free_memory, np.inf)))
+
+
+def _score(
+        memory: float,
+        cpu: float,
+        free_memory: np.ndarray,
+        free_cpu: np.ndarray,
+        policy: PackingPolicy,
+        node_memory: float,
+        node_cpu: float
+) -> int:
+    fits = (free_memory >= memory) & (free_cpu >= cpu)
+    if not fits.any():
+        return -1
+    if policy == PackingPolicy.DOT_PRODUCT:
+        # align the demand vector with the free capacity vector
+        score = (memory / node_memory) * (free_memory / node_memory) + (cpu / node_cpu) * (free_cpu / node_cpu)
+    else:
+        # leave the smallest residual capacity vector behind
+        score = -(((free_memory - memory) / node_memory) ** 2 + ((free_cpu - cpu) / node_cpu) ** 2)
+    return int(np.argmax(np.where(fits, score, -np.inf)))
+
+
+def _completion_fit(
+        memory: float,
+        cpu: float,
+        duration: float,
+        free_memory: np.ndarray,
+        free_cpu: np.ndarray,
+        time_to_end: np.ndarray,
+        node_memory: float,
+        node_cpu: float,
+        time_slot: float
+) -> int:
+    fits = (free_memory >= memory) & (free_cpu >= cpu)
+    if not fits.any():
+        return -1
+    # fewest slots the node stays billed for longer, a node that outlives the action costs nothing,
+    # then the tightest fit, the residual term stays below one slot
+    extension = np.ceil(np.maximum(duration - time_to_end, 0) / time_slot)
+    residual = ((free_memory - memory) / node_memory) ** 2 + ((free_cpu - cpu) / node_cpu) ** 2
+    return int(np.argmin(np.where(fits, extension + residual / 3, np.inf)))
+
+
+def _pack(
+        memory: np.ndarray,
+        cpu: np.ndarray,
+        free_memory: np.ndarray,
+        free_cpu: np.ndarray,
+        policy: PackingPolicy,
+        decreasing: bool,
+        node_memory: float,
+        node_cpu: float,
+        duration: np.ndarray | None,
+        time_to_end: np.ndarray | None,
+        time_slot: float,
+        catalog: list[NodeShape] | None = None,
+        used_memory: float = 0,
+        used_cpu: float = 0
+) -> tuple[np.ndarray, list[int]]:
+    # bins past the given free capacity arrays are new nodes opened when nothing fits
+    free_memory, free_cpu = np.array(free_memory, dtype=float), np.array(free_cpu, dtype=float)
+    if policy == PackingPolicy.COMPLETION_TIME:
+        if duration is None or time_to_end is None:
+            raise ValueError('the completion time policy needs the durations and the nodes\' time to end')
+        time_to_end = np.maximum(np.array(time_to_end, dtype=float), 0)
+    order = np.arange(len(memory))
+    if decreasing:
+        order = np.argsort(-np.maximum(memory / node_memory, cpu / node_cpu), kind='stable')
+    if catalog is not None:
+        pending_memory, pending_cpu = pending_demand(catalog, memory[order], cpu[order], used_memory, used_cpu)
+
+    # room for one new node per item, the nodes past `count` are not opened yet
+    count = len(free_memory)
+    free_memory = np.append(free_memory, np.full(len(memory), float(node_memory)))
+    free_cpu = np.append(free_cpu, np.full(len(memory), float(node_cpu)))
+    if policy == PackingPolicy.COMPLETION_TIME:
+        time_to_end = np.append(time_to_end, np.zeros(len(memory)))
+
+    assignment = np.full(len(memory), -1, dtype=np.int64)
+    shapes = []
+    for k, i in enumerate(order):
+        if policy == PackingPolicy.FIRST_FIT:
+            j = _first_fit(memory[i], cpu[i], free_memory[:count], free_cpu[:count])
+        elif policy == PackingPolicy.BEST_FIT:
+            j = _best_fit(memory[i], cpu[i], free_memory[:count], free_cpu[:count])
+        elif policy == PackingPolicy.COMPLETION_TIME:
+            j = _completion_fit(
+                memory[i], cpu[i], duration[i], free_memory[:count], free_cpu[:count], time_to_end[:count],
+                node_memory, node_cpu, time_slot
+            )
+        else:
+            j = _score(memory[i], cpu[i], free_memory[:count], free_cpu[:count], policy, node_memory, node_cpu)
+        if j < 0:
+            j = count
+            count += 1
+            if catalog is not None:
+                shape = choose_shape(catalog, pending_memory[k], pending_cpu[k], memory[i], cpu[i])
+                shapes.append(shape)
+                free_memory[j], free_cpu[j] = catalog[shape].memory, catalog[shape].cpu
+        free_memory[j] -= memory[i]
+        free_cpu[j] -= cpu[i]
+        if policy == PackingPolicy.COMPLETION_TIME:
+            time_to_end[j] = max(time_to_end[j], duration[i])
+        assignment[i] = j
+    return assignment, shapes
+
+
+def pack(
+        memory: np.ndarray,
+        cpu: np.ndarray,
+        free_memory: np.ndarray,
+        free_cpu: np.ndarray,
+        policy: PackingPolicy = PackingPolicy.FIRST_FIT,
+        decreasing: bool = True,
+        node_memory: float = NODE_MEMORY,
+        node_cpu: float = NODE_CPU,
+        duration: np.ndarray | None = None,
+        time_to_end: np.ndarray | None = None,
+        time_slot: float = TIME_SLOT
+) -> np.ndarray:
+    return _pack(
+        memory, cpu, free_memory, free_cpu, policy, decreasing, node_memory, node_cpu, duration, time_to_end,
+        time_slot
+    )[0]
+
+
+def pack_shaped(
+        memory: np.ndarray,
+        cpu: np.ndarray,
+        free_memory: np.ndarray,
+        free_cpu: np.ndarray,
+        catalog: list[NodeShape],
+        used_memory: float = 0,
+        used_cpu: float = 0,
+        policy: PackingPolicy = PackingPolicy.FIRST_FIT,
+        decreasing: bool = True,
+        duration: np.ndarray | None = None,
+        time_to_end: np.ndarray | None = None,
+        time_slot: float = TIME_SLOT
+) -> tuple[np.ndarray, list[int]]:
+    """Like `pack`, every new node takes the catalog shape `choose_shape` picks for it.
+
+    Returns the assignment and the catalog index of every new node. A new node is
+    shaped for the running demand, `used_memory` and `used_cpu`, plus the item it
+    is opened for and the items after it.
+    """
+    return _pack(
+        memory, cpu, free_memory, free_cpu, policy, decreasing, catalog[0].memory, catalog[0].cpu, duration,
+        time_to_end, time_slot, catalog, used_memory, used_cpu
+    )
+
+
+def vector_packing(
+        activations: list[Action],
+        nodes: list[Node] | Cluster,
+        policy: PackingPolicy = PackingPolicy.FIRST_FIT,
+        decreasing: bool = True,
+        simulation: Simulation | None = None
+) -> list[Node] | Cluster:
+    simulation = resolve(simulation, nodes)
+    if isinstance(nodes, Cluster):
+        actions = nodes.add_activations(activations)
+        count = nodes.node_count
+        assignment, shapes = pack_shaped(
+            nodes.action_memory[actions], nodes.action_cpu[actions], nodes.free_memory, nodes.free_cpu,
+            simulation.catalog, nodes.usage_memory[:count].sum(), nodes.usage_cpu[:count].sum(), policy, decreasing,
+            nodes.action_duration[actions], nodes.time_to_end(), simulation.time_slot
+        )
+        for shape in shapes:
+            nodes.add_node(shape=shape)
+        nodes.place(actions, assignment)
+        return nodes
+
+    duration, time_to_end = None, None
+    if policy == PackingPolicy.COMPLETION_TIME:
+        duration = np.array([a.duration for a in activations], dtype=float)
+        time_to_end = np.array([n.time_to_end for n in nodes], dtype=float)
+    assignment, shapes = pack_shaped(
+        np.array([a.memory for a in activations], dtype=float),
+        np.array([a.cpu for a in activations], dtype=float),
+        np.array([n.free_memory for n in nodes], dtype=float),
+        np.array([n.free_cpu for n in nodes], dtype=float),
+        simulation.catalog, sum(n.usage_memory for n in nodes), sum(n.usage_cpu for n in nodes),
+        policy, decreasing, duration, time_to_end, simulation.time_slot
+    )
+    nodes += [simulation.new_node(shape) for shape in shapes]
+    for activation, j in zip(activations, assignment):
+        activation.add_to_node(nodes[j])
+    return nodes
+
+
+def first_fit_decreasing(
+        activations: list[Action],
+        nodes: list[Node] | Cluster,
+        simulation: Simulation | None = None
+) -> list[Node] | Cluster:
+    return vector_packing(activations, nodes, PackingPolicy.FIRST_FIT, decreasing=True, simulation=simulation)
+
+
+def best_fit(
+        activations: list[Action],
+        nodes: list[Node] | Cluster,
+        simulation: Simulation | None = None
+) -> list[Node] | Cluster:
+    return vector_packing(activations, nodes, PackingPolicy.BEST_FIT, decreasing=False, simulation=simulation)
+
+
+def dot_product(
+        activations: list[Action],
+        nodes: list[Node] | Cluster,
+        simulation: Simulation | None = None
+) -> list[Node] | Cluster:
+    return vector_packing(activations, nodes, PackingPolicy.DOT_PRODUCT, decreasing=False, simulation=simulation)
+
+
+def l2_norm(
+        activations: list[Action],
+        nodes: list[Node] | Cluster,
+        simulation: Simulation | None = None
+) -> list[Node] | Cluster:
+    return vector_packing(activations, nodes, PackingPolicy.L2_NORM, decreasing=False, simulation=simulation)
+
+
+def completion_time_fit(
+        activations: list[Action],
+        nodes: list[Node] | Cluster,
+        simulation: Simulation | None = None
+) -> list[Node] | Cluster:
+    return vector_packing(activations, nodes, PackingPolicy.COMPLETION_TIME, decreasing=True, simulation=simulation)
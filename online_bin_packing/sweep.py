@@ -0,0 +1,184 @@
+import csv
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from typing import Callable
+
+import numpy as np
+
+from online_bin_packing.checkpoint import atomic_write
+from online_bin_packing.cluster import Cluster
+from online_bin_packing.compare import Algorithm
+from online_bin_packing.models import Report
+from online_bin_packing.simulation import Simulation
+from online_bin_packing.system import NODE_CPU, NODE_MEMORY, NODE_PRICE_HOUR, TIME_SLOT, cache_dir, result_dir
+from online_bin_packing.utils import run_solver
+from online_bin_packing.workload import WorkloadGenerator
+
+# configuration axes a grid can sweep, with the values used when an axis is not given
+AXES = {
+    'node_memory': NODE_MEMORY,
+    'node_cpu': NODE_CPU,
+    'time_slot': TIME_SLOT,
+    'node_price_hour': NODE_PRICE_HOUR,
+    'classes': None,
+}
+
+SUMMARY_FIELDS = (
+    'solver', 'node_memory', 'node_cpu', 'time_slot', 'node_price_hour', 'classes', 'seed',
+    'cost', 'mean_node_count', 'max_node_count', 'cpu_utilization', 'memory_utilization',
+    'cpu_waste_price', 'memory_waste_price', 'cached',
+)
+
+
+class Point:
+    def __init__(
+            self,
+            algorithm: Algorithm,
+            config: dict,
+            action_classes: list['ActionClass'],
+            seed: int,
+            duration: float
+    ):
+        self.algorithm = algorithm
+        self.config = config
+        self.action_classes = action_classes
+        self.seed = seed
+        self.duration = duration
+
+    @property
+    def key(self) -> str:
+        # everything the metrics depend on, so a changed class or solver argument is a different point
+        key = json.dumps({
+            'config': {name: value for name, value in self.config.items() if name != 'classes'},
+            'classes': [[c.name, c.config_key, c.inter_arrival_mean] for c in self.action_classes],
+            'seed': self.seed,
+            'duration': self.duration,
+            'solver': f'{self.algorithm.solver.__module__}.{self.algorithm.solver.__qualname__}',
+            'cluster': self.algorithm.cluster,
+            'kwargs': {name: _jsonable(value) for name, value in sorted(self.algorithm.kwargs.items())},
+        }, sort_keys=True)
+        return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _jsonable(value):
+    if isinstance(value, Enum):
+        return f'{type(value).__name__}.{value.name}'
+    if callable(value):
+        return f'{value.__module__}.{value.__qualname__}'
+    return value
+
+
+def aggregate(reports: list[Report]) -> dict:
+    if not reports:
+        return {
+            'cost': 0.0, 'mean_node_count': 0.0, 'max_node_count': 0, 'cpu_utilization': 0.0,
+            'memory_utilization': 0.0, 'cpu_waste_price': 0.0, 'memory_waste_price': 0.0,
+        }
+    return {
+        'cost': float(sum(r.price for r in reports)),
+        'mean_node_count': float(np.mean([r.node_count for r in reports])),
+        'max_node_count': int(max(r.node_count for r in reports)),
+        'cpu_utilization': float(np.mean([r.cpu_utilization for r in reports])),
+        'memory_utilization': float(np.mean([r.memory_utilization for r in reports])),
+        'cpu_waste_price': float(sum(r.cpu_waste_price for r in reports)),
+        'memory_waste_price': float(sum(r.memory_waste_price for r in reports)),
+    }
+
+
+def _run_point(point: Point) -> dict:
+    simulation = Simulation(
+        node_memory=point.config['node_memory'],
+        node_cpu=point.config['node_cpu'],
+        time_slot=point.config['time_slot'],
+        node_price_hour=point.config['node_price_hour'],
+        seed=point.seed
+    )
+    generator = WorkloadGenerator(point.action_classes, seed=point.seed, time_slot=simulation.time_slot)
+    workload = generator.generate(int(point.duration / simulation.time_slot))
+    algorithm = point.algorithm
+    nodes = Cluster(simulation=simulation) if algorithm.cluster else []
+    reports: list[Report] = []
+    for slot in range(int(point.duration / simulation.time_slot)):
+        simulation.time = slot * simulation.time_slot
+        nodes = run_solver(
+            algorithm.name, algorithm.solver, nodes, workload.for_slot(slot), reports, simulation=simulation,
+            **algorithm.kwargs
+        )
+    return aggregate(reports)
+
+
+def grid_points(
+        grid: dict[str, list],
+        solvers: dict[str, Callable | tuple[Callable, dict]],
+        action_classes: list['ActionClass'],
+        seeds: tuple[int, ...] = (0,),
+        duration: float = 60
+) -> list[Point]:
+    """Expands a grid of configuration axes into one point per (configuration, solver, seed).
+
+    The `classes` axis takes tuples of class names picked from `action_classes`,
+    a solver entry is either the solver or a (solver, kwargs) pair.
+    """
+    unknown = set(grid) - set(AXES)
+    if unknown:
+        raise ValueError(f'unknown sweep axes {sorted(unknown)}, expected some of {sorted(AXES)}')
+    by_name = {c.name: c for c in action_classes}
+    names = list(AXES)
+    points = []
+    for values in itertools.product(*(grid.get(name, [AXES[name]]) for name in names)):
+        config = dict(zip(names, values))
+        classes = action_classes if config['classes'] is None else [by_name[name] for name in config['classes']]
+        config['classes'] = tuple(c.name for c in classes)
+        for (solver_name, solver), seed in itertools.product(solvers.items(), seeds):
+            solver, kwargs = solver if isinstance(solver, tuple) else (solver, {})
+            points.append(Point(Algorithm(solver_name, solver, **kwargs), config, classes, seed, duration))
+    return points
+
+
+def sweep(
+        points: list[Point],
+        processes: int | None = None,
+        directory: str = f'{cache_dir}/sweep',
+        summary_path: str | None = f'{result_dir}/sweep/summary.csv'
+) -> list[dict]:
+    """Runs the points that are not cached yet in a process pool and returns one summary row per point."""
+    os.makedirs(directory, exist_ok=True)
+    metrics, missing = {}, []
+    for point in points:
+        path = f'{directory}/{point.key}.json'
+        if os.path.exists(path):
+            with open(path) as f:
+                metrics[point.key] = json.load(f)
+        else:
+            missing.append(point)
+
+    if missing:
+        with ProcessPoolExecutor(max_workers=processes or min(len(missing), os.cpu_count() or 1)) as pool:
+            for point, result in zip(missing, pool.map(_run_point, missing)):
+                path = f'{directory}/{point.key}.json'
+                atomic_write(path, json.dumps(result).encode())
+                metrics[point.key] = result
+
+    computed = {point.key for point in missing}
+    rows = [
+        {
+            'solver': point.algorithm.name,
+            **{name: value for name, value in point.config.items() if name != 'classes'},
+            'classes': ' '.join(point.config['classes']),
+            'seed': point.seed,
+            **metrics[point.key],
+            'cached': point.key not in computed,
+        }
+        for point in points
+    ]
+    if summary_path is not None:
+        os.makedirs(os.path.dirname(summary_path), exist_ok=True)
+        with open(summary_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows
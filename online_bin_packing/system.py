@@ -1,6 +1,6 @@
+import os
 import time
 
-SYSTEM_TIME = 0
 TIME_SLOT = 0.2
 PLOT = True
 
@@ -14,5 +14,16 @@ MAX_MEMORY_ACTION = 1024 * 32
 MIN_CPU_ACTION = 0.83
 MAX_CPU_ACTION = 8
 
-NODE_PRICE_TIME_SLOT = 2.4 / (60 * 60 / TIME_SLOT)
+NODE_PRICE_HOUR = 2.4
+NODE_PRICE_TIME_SLOT = NODE_PRICE_HOUR / (60 * 60 / TIME_SLOT)
+# name, memory, cpu and price per hour of the node shapes a heterogeneous catalog offers
+NODE_CATALOG = (
+    ('general', NODE_MEMORY, NODE_CPU, NODE_PRICE_HOUR),
+    ('compute', 1024 * 96 * 0.9, 64 * 0.9, 2.0),
+    ('memory', 1024 * 256 * 0.9, 32 * 0.9, 1.9),
+)
 result_dir = f'../result/{int(time.time())}'
+cache_dir = os.environ.get(
+    'ONLINE_BIN_PACKING_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'online_bin_packing')
+)
@@ -0,0 +1,186 @@
+import json
+import os
+from typing import Callable, Iterator
+
+import numpy as np
+
+from online_bin_packing.checkpoint import STATEFUL, Checkpointer
+from online_bin_packing.cluster import Cluster
+from online_bin_packing.models import Node, Report
+from online_bin_packing.simulation import Simulation, resolve
+from online_bin_packing.system import TIME_SLOT
+from online_bin_packing.utils import run_solver
+from online_bin_packing.workload import ActivationBatch
+
+# one fixed-width record per activation, the file is a flat array of these; allocations are kept in double
+# precision so a replayed action has exactly the cpu and memory of its class's best configuration
+TRACE_DTYPE = np.dtype([
+    ('slot', '<u4'),
+    ('class_id', '<u2'),
+    ('cpu', '<f8'),
+    ('memory', '<f8'),
+    ('duration', '<f8'),
+])
+
+
+class TraceWriter:
+    """Appends activation batches to a binary trace plus a small json header."""
+
+    def __init__(self, path: str, class_names: list[str] | None = None, time_slot: float = TIME_SLOT):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.class_names = class_names or []
+        self.time_slot = time_slot
+        self._file = open(path, 'wb')
+        self.count = 0
+        self.slot_count = 0
+        # null until close, a recording that dies before then is read up to its last record
+        self._write_header(None)
+
+    def _write_header(self, slot_count: int | None):
+        with open(f'{self.path}.json', 'w') as f:
+            json.dump({
+                'dtype': TRACE_DTYPE.descr,
+                'class_names': self.class_names,
+                'time_slot': self.time_slot,
+                'slot_count': slot_count,
+            }, f)
+
+    def write(self, batch: ActivationBatch):
+        records = np.empty(len(batch), dtype=TRACE_DTYPE)
+        records['slot'] = batch.slot
+        records['class_id'] = batch.class_id
+        records['cpu'] = batch.cpu
+        records['memory'] = batch.memory
+        records['duration'] = batch.duration
+        records.tofile(self._file)
+        self.count += len(records)
+        self.slot_count = max(self.slot_count, batch.slot_count)
+
+    def close(self):
+        self._file.close()
+        # written again, so slots without arrivals at the end of the recording are replayed too
+        self._write_header(self.slot_count)
+
+    def __enter__(self) -> 'TraceWriter':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def record(path: str, batch: ActivationBatch, time_slot: float = TIME_SLOT):
+    with TraceWriter(path, [c.name for c in batch.action_classes], time_slot) as writer:
+        writer.write(batch)
+
+
+class TraceReader:
+    """Memory-maps a trace and streams it back as activation batches.
+
+    Without `action_classes` the batches still carry cpu, memory and duration,
+    which is all a `Cluster` needs to replay them.
+    """
+
+    def __init__(self, path: str, action_classes: list['ActionClass'] | None = None):
+        with open(f'{path}.json') as f:
+            header = json.load(f)
+        self.class_names: list[str] = header['class_names']
+        self.time_slot: float = header['time_slot']
+        self._slot_count: int | None = header.get('slot_count')
+        self.action_classes = action_classes or []
+        # the header's layout, so traces recorded with single precision allocations still read
+        dtype = np.dtype([tuple(field) for field in header['dtype']])
+        self.records = np.memmap(path, dtype=dtype, mode='r') if os.path.getsize(path) else np.empty(0, dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def slot_count(self) -> int:
+        if self._slot_count is not None:
+            return self._slot_count
+        # traces whose header has no slot count, or that were not closed, end at their last activation
+        return int(self.records['slot'][-1]) + 1 if len(self.records) else 0
+
+    def _batch(self, records: np.ndarray) -> ActivationBatch:
+        slot = records['slot'].astype(np.int64)
+        return ActivationBatch(
+            action_classes=self.action_classes,
+            slot=slot,
+            class_id=records['class_id'].astype(np.int64),
+            cpu=records['cpu'].astype(float),
+            memory=records['memory'].astype(float),
+            duration=records['duration'].astype(float),
+            arrival_time=slot * self.time_slot,
+        )
+
+    def chunks(self, chunk_size: int = 1 << 16) -> Iterator[ActivationBatch]:
+        for start in range(0, len(self.records), chunk_size):
+            yield self._batch(self.records[start:start + chunk_size])
+
+    def slots(self, chunk_size: int = 1 << 16) -> Iterator[tuple[int, ActivationBatch]]:
+        # every slot up to the last one is yielded, slots without arrivals as empty batches
+        slot = 0
+        pending = self._batch(self.records[:0])
+        for chunk in self.chunks(chunk_size):
+            pending = _concatenate(pending, chunk)
+            # the last slot of a chunk may continue in the next chunk
+            last = int(pending.slot[-1])
+            while slot < last:
+                yield slot, pending.for_slot(slot)
+                slot += 1
+            pending = pending.for_slot(last)
+        while slot < self.slot_count:
+            yield slot, pending.for_slot(slot)
+            slot += 1
+
+
+def _concatenate(first: ActivationBatch, second: ActivationBatch) -> ActivationBatch:
+    return ActivationBatch(
+        first.action_classes,
+        *(np.concatenate([getattr(first, name), getattr(second, name)])
+          for name in ('slot', 'class_id', 'cpu', 'memory', 'duration', 'arrival_time'))
+    )
+
+
+def replay(
+        path: str,
+        algorithm_name: str,
+        solver: Callable,
+        nodes: list[Node] | Cluster | None = None,
+        action_classes: list['ActionClass'] | None = None,
+        chunk_size: int = 1 << 16,
+        simulation: Simulation | None = None,
+        checkpoint: Checkpointer | None = None, **kwargs
+) -> list[Report]:
+    """Runs the solver over every slot of a recorded trace and returns one report per slot.
+
+    With a `checkpoint`, the run is saved every `checkpoint.every` slots and after
+    the last one, and a replay whose checkpoint directory already holds a
+    checkpoint continues from it with the reports written so far.
+    """
+    reader = TraceReader(path, action_classes)
+    simulation = resolve(simulation, nodes)
+    nodes = Cluster(simulation=simulation) if nodes is None else nodes
+    reports: list[Report] = []
+    start = 0
+    if checkpoint is not None:
+        saved = checkpoint.load(simulation, reader.action_classes)
+        if saved is not None:
+            start, nodes, reports = saved['slot'], saved['nodes'], saved['reports']
+            # restored into the caller's objects, so they keep reflecting the run
+            for name, value in saved['state'].items():
+                vars(kwargs[name]).update(vars(value))
+            if kwargs.get('sink') is not None:
+                kwargs['sink'].truncate(algorithm_name, len(reports))
+    for slot, batch in reader.slots(chunk_size):
+        if slot < start:
+            continue
+        simulation.time = slot * reader.time_slot
+        nodes = run_solver(algorithm_name, solver, nodes, batch, reports, simulation=simulation, **kwargs)
+        if checkpoint is not None and (checkpoint.due(slot) or slot == reader.slot_count - 1):
+            state = {name: kwargs[name] for name in STATEFUL if kwargs.get(name) is not None}
+            checkpoint.save(slot, nodes, reports, simulation, reader.action_classes, state)
+    return reports
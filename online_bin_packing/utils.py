@@ -1,60 +1,115 @@
-import copy
-import os
+import inspect
+import time
 from typing import Callable
 
 import numpy as np
-from matplotlib import pyplot as plt
-
-from online_bin_packing.models import Node, Report, Action
-from online_bin_packing.system import result_dir
-
-
-def plot(algorithm_name: str, reports: list[Report]) -> None:
-    path_to_file = f'{result_dir}/solver/{algorithm_name}'
-    if not os.path.exists(path_to_file):
-        os.makedirs(path_to_file)
-    x = [r.time for r in reports]
-    plt.plot(x, [len(r.nodes) for r in reports])
-    plt.xlabel('time (s)')
-    plt.ylabel('vm count')
-    plt.title(algorithm_name)
-    plt.savefig(f'{path_to_file}/pod_count')
-    plt.close()
-
-    plt.plot(x, [r.cpu_utilization for r in reports])
-    plt.xlabel('time (s)')
-    plt.ylabel('cpu utilization')
-    plt.title(algorithm_name)
-    plt.savefig(f'{path_to_file}/cpu_utilization')
-    plt.close()
-
-    plt.plot(x, [r.memory_utilization for r in reports])
-    plt.xlabel('time (s)')
-    plt.ylabel('memory utilization')
-    plt.title(algorithm_name)
-    plt.savefig(f'{path_to_file}/memory_utilization')
-    plt.close()
-
-    plt.plot(x, np.cumsum([r.price for r in reports]))
-    plt.xlabel('time (s)')
-    plt.ylabel('cost ($)')
-    plt.title(algorithm_name)
-    plt.savefig(f'{path_to_file}/cost')
-    plt.close()
+
+from online_bin_packing.cluster import Cluster
+from online_bin_packing.consolidation import Consolidator
+from online_bin_packing.metrics import FIELDS, MetricsSink, render, report_row
+from online_bin_packing.models import Node, Report, Action, SolveInfo
+from online_bin_packing.provisioning import Provisioner
+from online_bin_packing.simulation import Simulation, resolve
+from online_bin_packing.workload import ActivationBatch
+
+
+def plot(algorithm_name: str, reports: list[Report], simulation: Simulation | None = None) -> None:
+    simulation = resolve(simulation)
+    with simulation.profiler.phase('plot'):
+        columns = {field: np.array([row[field] for row in map(report_row, reports)]) for field in FIELDS}
+        render(algorithm_name, columns, f'{simulation.result_dir}/solver/{algorithm_name}')
+
+
+def call_solver(
+        solver: Callable,
+        activations: list[Action],
+        nodes: list[Node] | Cluster,
+        simulation: Simulation | None = None, **kwargs
+) -> tuple[list[Node] | Cluster, SolveInfo]:
+    solve_info = SolveInfo()
+    parameters = inspect.signature(solver).parameters
+    if 'solve_info' in parameters:
+        kwargs['solve_info'] = solve_info
+    if 'simulation' in parameters and simulation is not None:
+        kwargs['simulation'] = simulation
+    start = time.perf_counter()
+    nodes = solver(activations=activations, nodes=nodes, **kwargs)
+    solve_info.time = time.perf_counter() - start
+    return nodes, solve_info
 
 
 def run_solver(
         algorithm_name: str,
         solver: Callable,
-        nodes: list[Node],
-        activations: list[Action],
-        reports: list[Report], **kwargs
-) -> list[Node]:
-    for node in nodes:
-        node.revise_actions()
-    nodes: list[Node] = solver(activations=copy.deepcopy(activations), nodes=copy.deepcopy(nodes), **kwargs)
-    bin_packing_nodes = list(filter(lambda n: len(n.actions), nodes))
-    reports.append(Report(algorithm_name, nodes=bin_packing_nodes))
-
-    plot(algorithm_name, reports)
+        nodes: list[Node] | Cluster,
+        activations: list[Action] | ActivationBatch,
+        reports: list[Report],
+        sink: MetricsSink | None = None,
+        simulation: Simulation | None = None,
+        provisioner: Provisioner | None = None,
+        consolidator: Consolidator | None = None, **kwargs
+) -> list[Node] | Cluster:
+    simulation = resolve(simulation, nodes)
+    profiler = simulation.profiler
+    if isinstance(nodes, Cluster):
+        with profiler.phase('revise'):
+            nodes.revise_actions()
+        before = nodes.node_count
+        with profiler.phase('solver'):
+            nodes, solve_info = call_solver(
+                solver, activations=activations, nodes=nodes, simulation=simulation, **kwargs
+            )
+        # nodes the solver had to open beyond the pool are cold starts
+        cold_starts = max(nodes.node_count - before, 0)
+        consolidation = None
+        if consolidator is not None:
+            # drained nodes are released before the warm pool is sized
+            with profiler.phase('consolidate'):
+                nodes, consolidation = consolidator.consolidate(nodes, simulation)
+        warm_count, warm_price = 0, 0.0
+        if provisioner is not None:
+            with profiler.phase('provision'):
+                provisioner.observe(activations)
+                nodes, warm_count, warm_price = provisioner.provision(nodes, simulation)
+        with profiler.phase('report'):
+            reports.append(Report(
+                algorithm_name, nodes=nodes, solve_info=solve_info, simulation=simulation,
+                warm_count=warm_count, warm_price=warm_price, cold_starts=cold_starts, consolidation=consolidation
+            ))
+    else:
+        with profiler.phase('revise'):
+            for node in nodes:
+                node.revise_actions()
+        with profiler.phase('copy'):
+            if isinstance(activations, ActivationBatch):
+                activations = activations.to_actions()
+            # every algorithm places its own copies, the nodes are already owned by this algorithm
+            activations = [a.copy() for a in activations]
+        before = len(nodes)
+        with profiler.phase('solver'):
+            nodes, solve_info = call_solver(
+                solver, activations=activations, nodes=nodes, simulation=simulation, **kwargs
+            )
+        cold_starts = max(len(nodes) - before, 0)
+        consolidation = None
+        if consolidator is not None:
+            with profiler.phase('consolidate'):
+                nodes, consolidation = consolidator.consolidate(nodes, simulation)
+        warm_count, warm_price = 0, 0.0
+        if provisioner is not None:
+            with profiler.phase('provision'):
+                provisioner.observe(activations)
+                nodes, warm_count, warm_price = provisioner.provision(nodes, simulation)
+        with profiler.phase('report'):
+            bin_packing_nodes = list(filter(lambda n: len(n.actions), nodes))
+            reports.append(Report(
+                algorithm_name, nodes=bin_packing_nodes, solve_info=solve_info, simulation=simulation,
+                warm_count=warm_count, warm_price=warm_price, cold_starts=cold_starts, consolidation=consolidation
+            ))
+
+    if sink is not None:
+        with profiler.phase('sink'):
+            sink.append(algorithm_name, reports[-1])
+    if profiler.enabled:
+        reports[-1].profile = profiler.take()
     return nodes
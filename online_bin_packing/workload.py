@@ -0,0 +1,94 @@
+import numpy as np
+
+from online_bin_packing.system import TIME_SLOT
+
+
+class ActivationBatch:
+    """Array-backed activations, one entry per activation, sorted by slot."""
+
+    def __init__(
+            self,
+            action_classes: list['ActionClass'],
+            slot: np.ndarray,
+            class_id: np.ndarray,
+            cpu: np.ndarray,
+            memory: np.ndarray,
+            duration: np.ndarray,
+            arrival_time: np.ndarray,
+            slot_count: int | None = None
+    ):
+        self.action_classes = action_classes
+        self.slot = slot
+        self.class_id = class_id
+        self.cpu = cpu
+        self.memory = memory
+        self.duration = duration
+        self.arrival_time = arrival_time
+        # slots the batch covers from slot 0, trailing slots without arrivals included when given
+        self.slot_count = (int(slot[-1]) + 1 if len(slot) else 0) if slot_count is None else slot_count
+
+    def __len__(self) -> int:
+        return len(self.slot)
+
+    def __getitem__(self, index: slice | np.ndarray) -> 'ActivationBatch':
+        return ActivationBatch(
+            self.action_classes, self.slot[index], self.class_id[index], self.cpu[index],
+            self.memory[index], self.duration[index], self.arrival_time[index]
+        )
+
+    def for_slot(self, slot: int) -> 'ActivationBatch':
+        start, end = np.searchsorted(self.slot, [slot, slot + 1])
+        return self[start:end]
+
+    def to_actions(self) -> list['Action']:
+        # for the list based solvers, actions keep the batch's allocation
+        actions = []
+        for class_id, cpu, memory in zip(self.class_id.tolist(), self.cpu.tolist(), self.memory.tolist()):
+            action_class = self.action_classes[class_id]
+            if cpu == action_class.best_cpu and memory == action_class.best_memory:
+                actions.append(action_class.generate_activation())
+            else:
+                actions.append(action_class.generate_activation(cpu=cpu, memory=memory))
+        return actions
+
+
+class WorkloadGenerator:
+    """Samples the arrivals of every class for many slots at once.
+
+    Each class draws its per-slot arrival count from the same gamma model as
+    `ActionClass.get_inter_arrival`, from a generator seeded once per run.
+    """
+
+    def __init__(self, action_classes: list['ActionClass'], seed: int | None = None, time_slot: float = TIME_SLOT):
+        self.action_classes = action_classes
+        self.time_slot = time_slot
+        self.rng = np.random.default_rng(seed)
+        means = np.array([c.inter_arrival_mean for c in action_classes], dtype=float)
+        self.shape = means ** 2
+        self.scale = 1 / means
+        self.best_cpu = np.array([c.best_cpu for c in action_classes], dtype=float)
+        self.best_memory = np.array([c.best_memory for c in action_classes], dtype=float)
+        self.best_duration = np.array([c.duration_of_best_config for c in action_classes], dtype=float)
+
+    def arrival_counts(self, slots: int) -> np.ndarray:
+        shape = (slots, len(self.action_classes))
+        return np.rint(self.rng.gamma(shape=self.shape, scale=self.scale, size=shape)).astype(np.int64)
+
+    def from_counts(self, counts: np.ndarray, start_slot: int = 0) -> ActivationBatch:
+        slots, classes = counts.shape
+        flat = counts.ravel()
+        slot = np.repeat(np.repeat(np.arange(start_slot, start_slot + slots), classes), flat)
+        class_id = np.repeat(np.tile(np.arange(classes), slots), flat)
+        return ActivationBatch(
+            action_classes=self.action_classes,
+            slot=slot,
+            class_id=class_id,
+            cpu=self.best_cpu[class_id],
+            memory=self.best_memory[class_id],
+            duration=self.best_duration[class_id],
+            arrival_time=slot * self.time_slot,
+            slot_count=start_slot + slots,
+        )
+
+    def generate(self, slots: int, start_slot: int = 0) -> ActivationBatch:
+        return self.from_counts(self.arrival_counts(slots), start_slot)
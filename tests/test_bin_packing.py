@@ -0,0 +1,45 @@
+import pulp
+
+from online_bin_packing.classes import all_action_class
+from online_bin_packing.events import EventSimulator
+from online_bin_packing.models import SolveInfo
+from online_bin_packing.simulation import Simulation
+from online_bin_packing.solver.bin_packing import ERROR, bin_packing
+
+
+def test_solver_failure_is_reported_as_error(monkeypatch):
+    def fail(problem, solver=None, **kwargs):
+        raise pulp.PulpSolverError('Pulp: Error while executing cbc')
+
+    monkeypatch.setattr(pulp.LpProblem, 'solve', fail)
+    simulation = Simulation(seed=0)
+    # three items over half a node each, the capacity bound of two nodes leaves the ILP something to prove
+    action_class = all_action_class[0]
+    activations = [
+        action_class.generate_activation(cpu=0.6 * simulation.node_cpu, memory=0.6 * simulation.node_memory)
+        for _ in range(3)
+    ]
+    solve_info = SolveInfo()
+    nodes = bin_packing(activations, [], time_budget=10, solve_info=solve_info, simulation=simulation)
+
+    assert solve_info.status == ERROR
+    # the greedy incumbent still places every activation
+    assert sum(len(n.actions) for n in nodes) == len(activations)
+
+
+def test_event_simulator_reports_failed_solves_as_error(monkeypatch):
+    def fail(problem, solver=None, **kwargs):
+        raise pulp.PulpSolverError('Pulp: Error while executing cbc')
+
+    monkeypatch.setattr(pulp.LpProblem, 'solve', fail)
+    simulation = Simulation(seed=0)
+    simulator = EventSimulator('bin packing', bin_packing, simulation=simulation, time_budget=10)
+    action_class = all_action_class[0]
+    simulator.submit([
+        action_class.generate_activation(cpu=0.6 * simulation.node_cpu, memory=0.6 * simulation.node_memory)
+        for _ in range(3)
+    ])
+    simulator.run(simulation.time_slot)
+
+    # the slot of the arrival, the next one has no solves
+    assert simulator.reports[0].solve_info.status == ERROR
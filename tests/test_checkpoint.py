@@ -0,0 +1,44 @@
+import subprocess
+import sys
+
+from online_bin_packing.checkpoint import Checkpointer
+from online_bin_packing.classes import all_action_class
+from online_bin_packing.cluster import Cluster
+from online_bin_packing.simulation import Simulation
+from online_bin_packing.workload import WorkloadGenerator
+
+# loads the checkpoint in a fresh process, prints how many classes the cluster has and saves it again
+RESUME = '''
+import sys
+from online_bin_packing.checkpoint import Checkpointer
+from online_bin_packing.classes import all_action_class
+from online_bin_packing.simulation import Simulation
+
+simulation = Simulation(seed=0)
+checkpointer = Checkpointer(sys.argv[1], every=1)
+saved = checkpointer.load(simulation, all_action_class)
+nodes = saved['nodes']
+nodes.add_activations(saved['state']['batch'])
+print(len(nodes.action_classes))
+checkpointer.save(saved['slot'], nodes, saved['reports'], simulation, all_action_class, {'batch': saved['state']['batch']})
+'''
+
+
+def _resume(directory) -> int:
+    result = subprocess.run(
+        [sys.executable, '-c', RESUME, str(directory)], capture_output=True, text=True, check=True
+    )
+    return int(result.stdout)
+
+
+def test_resume_in_new_process_keeps_action_classes(tmp_path):
+    simulation = Simulation(seed=0)
+    batch = WorkloadGenerator(all_action_class, seed=0).generate(5)
+    nodes = Cluster(simulation=simulation)
+    nodes.add_activations(batch)
+    classes = len(nodes.action_classes)
+    # the batch is stored with the checkpoint, its classes by name like the cluster's
+    Checkpointer(str(tmp_path), every=1).save(0, nodes, [], simulation, all_action_class, {'batch': batch})
+
+    assert _resume(tmp_path) == classes
+    assert _resume(tmp_path) == classes
@@ -0,0 +1,24 @@
+from online_bin_packing.models import Node
+from online_bin_packing.profiling import Profiler
+from online_bin_packing.simulation import Simulation
+
+
+def test_overlapping_property_profilers_restore_the_getters():
+    original = Node.usage_cpu.fget
+    node = Simulation().new_node()
+    a, b = Profiler(), Profiler()
+    a.enable(properties=True)
+    b.enable(properties=True)
+    node.usage_cpu
+    assert a.counts['Node.usage_cpu'] == b.counts['Node.usage_cpu'] == 1
+
+    a.disable()
+    node.usage_cpu
+    assert a.counts['Node.usage_cpu'] == 1
+    assert b.counts['Node.usage_cpu'] == 2
+
+    b.disable()
+    assert Node.usage_cpu.fget is original
+    node.usage_cpu
+    assert a.counts['Node.usage_cpu'] == 1
+    assert b.counts['Node.usage_cpu'] == 2
@@ -0,0 +1,15 @@
+from online_bin_packing.classes import all_action_class
+from online_bin_packing.cluster import Cluster
+from online_bin_packing.simulation import Simulation
+from online_bin_packing.solver.sequential import shuffle_sequential
+from online_bin_packing.workload import WorkloadGenerator
+
+
+def test_shuffle_sequential_places_a_batch_on_list_and_cluster_nodes():
+    batch = WorkloadGenerator(all_action_class, seed=0).generate(2)
+    simulation = Simulation(seed=0)
+    nodes = shuffle_sequential(batch, [], simulation)
+    assert sum(len(n.actions) for n in nodes) == len(batch)
+
+    cluster = shuffle_sequential(batch, Cluster(simulation=simulation), simulation)
+    assert len(cluster.running_actions) == len(batch)
@@ -0,0 +1,20 @@
+from online_bin_packing.classes import all_action_class
+from online_bin_packing.simulation import Simulation, default_simulation, resolve
+from online_bin_packing.solver.bin_packing import bin_packing
+from online_bin_packing.solver.sequential import sequential
+
+
+def test_resolve_prefers_the_simulation_of_listed_nodes():
+    simulation = Simulation(seed=0)
+    assert resolve(None, [simulation.new_node()]) is simulation
+    assert resolve(None, []) is default_simulation
+
+
+def test_solvers_without_a_simulation_use_the_nodes_one():
+    for solver in (sequential, bin_packing):
+        simulation = Simulation(seed=0, time=100)
+        activations = [c.generate_activation() for c in all_action_class for _ in range(4)]
+        nodes = solver(activations, [simulation.new_node()])
+
+        assert {n.simulation for n in nodes} == {simulation}
+        assert {a.start_time for a in activations} == {100}
@@ -0,0 +1,42 @@
+import json
+
+import numpy as np
+
+from online_bin_packing.classes import all_action_class
+from online_bin_packing.simulation import Simulation
+from online_bin_packing.solver.sequential import sequential
+from online_bin_packing.trace import TraceReader, TraceWriter, record, replay
+from online_bin_packing.workload import WorkloadGenerator
+
+
+def test_replay_keeps_empty_trailing_slots(tmp_path):
+    counts = np.ones((5, len(all_action_class)), dtype=np.int64)
+    counts[-1] = 0
+    batch = WorkloadGenerator(all_action_class, seed=0).from_counts(counts)
+    path = str(tmp_path / 'workload.trace')
+    record(path, batch)
+
+    reader = TraceReader(path, all_action_class)
+    assert reader.slot_count == 5
+    assert [len(slot_batch) for _, slot_batch in reader.slots()] == [len(all_action_class)] * 4 + [0]
+
+    reports = replay(path, 'sequential', sequential, action_classes=all_action_class, simulation=Simulation(seed=0))
+    assert len(reports) == 5
+
+
+def test_unclosed_trace_reads_up_to_its_last_record(tmp_path):
+    counts = np.ones((5, len(all_action_class)), dtype=np.int64)
+    counts[-1] = 0
+    batch = WorkloadGenerator(all_action_class, seed=0).from_counts(counts)
+    path = str(tmp_path / 'workload.trace')
+    writer = TraceWriter(path, [c.name for c in all_action_class])
+    with open(f'{path}.json') as f:
+        assert json.load(f)['slot_count'] is None
+
+    # the records of a recording that died before close, its header still has no slot count
+    batch_path = str(tmp_path / 'batch.trace')
+    record(batch_path, batch)
+    with open(batch_path, 'rb') as source, open(path, 'wb') as target:
+        target.write(source.read())
+    assert TraceReader(path).slot_count == 4
+    writer.close()